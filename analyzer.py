@@ -9,44 +9,106 @@ CHANGELOG v1.9:
 - CONSERVÉ: Structure v1.8 qui fonctionne
 """
 import re
+import io
 import json
-from typing import Dict, List, Optional
+import itertools
+import functools
+import asyncio
+import hashlib
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import orjson
+except ImportError:  # Repli sur json standard
+    orjson = None
+
+try:
+    from pydantic import BaseModel, TypeAdapter, ValidationError, field_validator
+except ImportError:  # Pas de validation de schéma sans pydantic
+    BaseModel = None
+
+
+# ============================================================================
+# REGEX EMAILS PRÉCOMPILÉES
+# ============================================================================
+
+# Une seule passe sur le texte: les 4 formats sont fusionnés en alternatives nommées.
+# IGNORECASE sauf at|AT / dot|DOT (?-i:): 'At'/'Dot' en casse mixte relèvent de la prose
+_EMAIL_ANY = re.compile(
+    r'(?P<std>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b)'
+    r'|(?P<spaced>\b(?P<sp_user>[A-Za-z0-9._%+-]+)\s*@\s*(?P<sp_dom>[A-Za-z0-9.-]+)\s*\.\s*(?P<sp_tld>[A-Za-z]{2,})\b)'
+    r'|(?P<atdot>\b(?P<at_user>[A-Za-z0-9._%+-]+)\s+(?-i:at|AT)\s+(?P<at_dom>[A-Za-z0-9.-]+)\s+(?-i:dot|DOT)\s+(?P<at_tld>[A-Za-z]{2,})\b)'
+    r'|(?P<bracket>\b(?P<br_user>[A-Za-z0-9._%+-]+)\s*\[at\]\s*(?P<br_dom>[A-Za-z0-9.-]+)\s*\[dot\]\s*(?P<br_tld>[A-Za-z]{2,})\b)',
+    re.IGNORECASE
+)
+_EMAIL_VALIDATE = re.compile(r'[\w\.\-\+]+@[\w\.\-]+\.\w{2,}')
+_WS_TABLE = str.maketrans('', '', ' \t\n\r\f\v')
 
 
 # ============================================================================
 # PATCH v1.9: MERGE UNIFIÉ PAGE + FICHIERS
 # ============================================================================
 
-def merge_all_content(data: Dict) -> str:
+def merge_all_content(data: Dict, max_chars: int = 12000) -> str:
     """
     Fusionne page + fichiers en un seul texte pour analyse.
     
+    L'écriture s'arrête dès que max_chars est atteint: le contenu au-delà
+    n'est jamais copié.
+    
     Args:
         data: Dict avec texte_complet et fichiers_attaches
+        max_chars: Taille max du texte unifié (suivi de "...[tronqué]")
     
     Returns:
         Texte unifié pour analyse IA
     """
-    parts = []
+    buf = io.StringIO()
+    remaining = max_chars
+    
+    def write(chunk: str) -> bool:
+        nonlocal remaining
+        if len(chunk) > remaining:
+            buf.write(chunk[:remaining])
+            buf.write("...[tronqué]")
+            return False
+        buf.write(chunk)
+        remaining -= len(chunk)
+        return True
+    
+    sep = ''
     
     # 1. Contenu page
     texte_page = data.get('texte_complet', '')
     if texte_page:
-        parts.append("=== CONTENU PAGE WEB ===")
-        parts.append(texte_page)
+        if not (write("=== CONTENU PAGE WEB ===") and write('\n\n') and write(texte_page)):
+            return buf.getvalue()
+        sep = '\n\n'
     
-    # 2. Contenu fichiers (si parsés)
+    # 2. Contenu fichiers (si parsés), une seule fois par document
+    seen = set()
     for f in data.get('fichiers_attaches', []):
         contenu = f.get('contenu_texte', '')
         if contenu:
+            # Même TDR rattaché plusieurs fois: empreinte des 512 premiers caractères
+            key = hashlib.blake2b(contenu[:512].encode('utf-8'), digest_size=8).digest()
+            if key in seen:
+                continue
+            seen.add(key)
+            
             nom = f.get('nom', 'fichier_inconnu')
-            parts.append(f"\n=== FICHIER: {nom} ===")
+            if not (write(sep) and write(f"\n=== FICHIER: {nom} ===") and write('\n\n')):
+                break
             # Limiter taille
             if len(contenu) > 4000:
                 contenu = contenu[:4000] + "...[tronqué]"
-            parts.append(contenu)
+            if not write(contenu):
+                break
+            sep = '\n\n'
     
-    return '\n\n'.join(parts)
+    return buf.getvalue()
 
 
 def normalize_and_dedup_emails(emails_page: List[str], emails_fichiers: List[str]) -> List[str]:
@@ -56,15 +118,32 @@ def normalize_and_dedup_emails(emails_page: List[str], emails_fichiers: List[str
     Returns:
         Liste unique, lowercase, triée
     """
-    all_emails = set()
+    return sorted(_valid_emails(itertools.chain(emails_page, emails_fichiers)))
+
+
+def _valid_emails(emails) -> Set[str]:
+    """Ensemble des emails normalisés (strip + lowercase) qui passent la validation complète."""
+    candidates = (
+        email.strip().lower()
+        for email in emails
+        if isinstance(email, str) and '@' in email
+    )
+    return {email for email in candidates if _EMAIL_VALIDATE.fullmatch(email)}
+
+
+def _merge_emails(emails_page: List[str], emails_fichiers: List[str], emails_ia) -> List[str]:
+    """
+    Fusionne emails regex (page + fichiers, fiables) et emails IA.
     
-    for email in emails_page + emails_fichiers:
-        if email and '@' in str(email):
-            normalized = email.strip().lower()
-            if re.match(r'^[\w\.\-\+]+@[\w\.\-]+\.\w{2,}$', normalized):
-                all_emails.add(normalized)
+    Seuls les emails renvoyés par l'IA passent par la validation complète.
+    Un seul ensemble, trié une seule fois.
     
-    return sorted(all_emails)
+    Returns:
+        Liste unique, lowercase, triée
+    """
+    emails = {e.strip().lower() for it in (emails_page, emails_fichiers) for e in it if e}
+    emails |= _valid_emails(emails_ia or [])
+    return sorted(emails)
 
 
 # ============================================================================
@@ -122,10 +201,115 @@ def get_all_emails_from_files(fichiers: List[Dict]) -> List[str]:
     Returns:
         Liste d'emails uniques
     """
-    all_emails = []
-    for f in fichiers:
-        all_emails.extend(f.get('emails_fichier', []))
-    return list(set(all_emails))
+    return list({e for f in fichiers for e in f.get('emails_fichier', ())})
+
+
+# ============================================================================
+# PRÉTRAITEMENT + CACHE ANALYSE
+# ============================================================================
+
+ANALYSIS_CACHE_DIR = Path("cache_analyse")
+_PREPROCESS_CACHE: Dict[str, Dict] = {}
+_PREPROCESS_CACHE_MAX = 256
+_PREPROCESS_CACHE_LOCK = threading.Lock()  # Replis exécutés via asyncio.to_thread
+
+
+def _content_hash(data: Dict) -> str:
+    """Empreinte SHA1 du contenu analysé (page + fichiers parsés)."""
+    h = hashlib.sha1()
+    h.update(data.get('url', '').encode('utf-8'))
+    h.update(data.get('texte_complet', '').encode('utf-8'))
+    for f in data.get('fichiers_attaches', []):
+        h.update(f.get('nom', '').encode('utf-8'))
+        h.update(f.get('contenu_texte', '').encode('utf-8'))
+    return h.hexdigest()
+
+
+def _preprocess(data: Dict) -> Dict:
+    """
+    Prépare une opportunité pour l'IA (mémoïsé par empreinte de contenu).
+    
+    Returns:
+        Dict {texte_unifie, emails_page, emails_fichiers, content_hash}
+    """
+    content_hash = _content_hash(data)
+    cached = _PREPROCESS_CACHE.get(content_hash)
+    if cached is not None:
+        return cached
+    
+    texte_unifie = merge_all_content(data, max_chars=12000)
+    
+    result = {
+        'texte_unifie': texte_unifie,
+        'emails_page': extract_emails_regex(data.get('texte_complet', '')),
+        'emails_fichiers': get_all_emails_from_files(data.get('fichiers_attaches', [])),
+        'content_hash': content_hash
+    }
+    
+    with _PREPROCESS_CACHE_LOCK:
+        if len(_PREPROCESS_CACHE) >= _PREPROCESS_CACHE_MAX:
+            _PREPROCESS_CACHE.pop(next(iter(_PREPROCESS_CACHE)), None)
+        _PREPROCESS_CACHE[content_hash] = result
+    return result
+
+
+def load_analysis_from_cache(cache_key: str) -> Optional[Dict]:
+    """Charge une analyse IA déjà calculée pour ce contenu."""
+    cache_file = ANALYSIS_CACHE_DIR / f"{cache_key}.json"
+    if cache_file.exists():
+        try:
+            if orjson is not None:
+                return orjson.loads(cache_file.read_bytes())
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
+    return None
+
+
+def save_analysis_to_cache(cache_key: str, result: Dict) -> None:
+    """Sauvegarde une analyse IA réussie (jamais le fallback)."""
+    try:
+        ANALYSIS_CACHE_DIR.mkdir(exist_ok=True)
+        cache_file = ANALYSIS_CACHE_DIR / f"{cache_key}.json"
+        if orjson is not None:
+            cache_file.write_bytes(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+            return
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        print(f"⚠️ Erreur écriture cache analyse: {e}")
+
+
+# ============================================================================
+# CLIENTS IA (réutilisés entre appels)
+# ============================================================================
+
+GEMINI_GENERATION_CONFIG = {
+    'temperature': 0.1,
+    'top_p': 0.9,
+    'max_output_tokens': 1024,
+}
+
+
+@functools.lru_cache(maxsize=4)
+def _get_claude_client(api_key: str):
+    """Client Anthropic unique par clé API (pool de connexions keep-alive réutilisé)."""
+    import anthropic
+    
+    return anthropic.Anthropic(api_key=api_key)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_gemini_model(api_key: str, model_name: str = 'gemini-2.0-flash'):
+    """Modèle Gemini unique par clé API."""
+    import google.generativeai as genai
+    
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(
+        model_name=model_name,
+        generation_config=GEMINI_GENERATION_CONFIG
+    )
 
 
 # ============================================================================
@@ -293,6 +477,63 @@ ANALYSE MAINTENANT.
 """
 
 
+# ============================================================================
+# PROMPT EXTRACTION v1.9 (parties statiques construites une seule fois)
+# ============================================================================
+
+_EXTRACTION_PROMPT_PREFIX = """Tu es un extracteur de données. Analyse le texte ci-dessous et extrait UNIQUEMENT:
+
+1. ORGANISATION: Le nom EXACT et COMPLET de l'entité qui publie cette offre.
+   - Copie le nom tel qu'il apparaît, sans abréger ni reformuler.
+   - Cherche: Association, Fondation, ONG, Direction, Ministère, etc.
+
+2. EMAILS: Tous les emails de contact trouvés.
+
+RÈGLES STRICTES:
+- NE PAS inventer. Si non trouvé, mettre "Non spécifié".
+- NE PAS résumer ou interpréter. Copier EXACTEMENT.
+- Répondre UNIQUEMENT en JSON valide, sans markdown.
+
+=== TEXTE À ANALYSER ===
+
+"""
+
+_EXTRACTION_PROMPT_SUFFIX = """
+
+=== FIN DU TEXTE ===
+
+Réponds avec ce JSON uniquement:
+{"organisation": "...", "emails": ["...", "..."], "secteur": "Autre", "type_opportunite": "Offre", "localisation": "Non spécifié", "resume": "...", "mots_cles": []}
+"""
+
+
+_BATCH_PROMPT_PREFIX = """Tu es un extracteur de données. Tu reçois plusieurs annonces, chacune dans une balise <doc id="N">. Pour CHAQUE annonce, extrait UNIQUEMENT:
+
+1. ORGANISATION: Le nom EXACT et COMPLET de l'entité qui publie cette offre.
+   - Copie le nom tel qu'il apparaît, sans abréger ni reformuler.
+   - Cherche: Association, Fondation, ONG, Direction, Ministère, etc.
+
+2. EMAILS: Tous les emails de contact trouvés.
+
+RÈGLES STRICTES:
+- Traiter chaque <doc> indépendamment, sans mélanger les annonces.
+- NE PAS inventer. Si non trouvé, mettre "Non spécifié".
+- NE PAS résumer ou interpréter. Copier EXACTEMENT.
+- Répondre UNIQUEMENT en JSON valide, sans markdown.
+
+=== ANNONCES À ANALYSER ===
+
+"""
+
+_BATCH_PROMPT_SUFFIX = """
+
+=== FIN DES ANNONCES ===
+
+Réponds avec un tableau JSON de {nb} objets, un par <doc>, en reprenant son "id":
+[{{"id": 1, "organisation": "...", "emails": ["...", "..."], "secteur": "Autre", "type_opportunite": "Offre", "localisation": "Non spécifié", "resume": "...", "mots_cles": []}}]
+"""
+
+
 # ============================================================================
 # FONCTION PRINCIPALE D'ANALYSE
 # ============================================================================
@@ -313,6 +554,12 @@ def analyze_opportunity(
     Returns:
         Dict avec analyse structurée
     """
+    # Même contenu + même IA = pas de nouvel appel LLM
+    pre = _preprocess(data)
+    cached = load_analysis_from_cache(f"{ai_type}_{pre['content_hash']}")
+    if cached is not None:
+        return cached
+    
     if ai_type == "claude":
         return analyze_with_claude(data, api_key)
     else:
@@ -323,12 +570,12 @@ def create_fallback_analysis(data: Dict) -> Dict:
     """Crée une analyse fallback si l'IA échoue."""
     texte = data.get('texte_complet', '')
     
-    # Emails de la page
-    emails = extract_emails_regex(texte)
+    # Emails de la page (déjà extraits par _preprocess lors de la tentative IA)
+    emails = _preprocess(data)['emails_page']
     
-    # Emails des fichiers (v1.8)
+    # Emails des fichiers (v1.8, extraits au scraping sur le texte complet)
     emails_files = data.get('emails_from_files', [])
-    all_emails = list(set(emails + emails_files))
+    all_emails = sorted({*emails, *emails_files})
     
     # Résumé
     resume = texte[:200] + "..." if len(texte) > 200 else texte
@@ -352,64 +599,26 @@ def create_fallback_analysis(data: Dict) -> Dict:
 def analyze_with_gemini(data: Dict, api_key: str) -> Dict:
     """Analyse avec Gemini (v1.9 - texte unifié)."""
     try:
-        import google.generativeai as genai
-        
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(
-            model_name='gemini-2.0-flash',
-            generation_config={
-                'temperature': 0.1,
-                'top_p': 0.9,
-                'max_output_tokens': 1024,
-            }
-        )
-        
-        # PATCH v1.9: Merge tout le contenu
-        texte_unifie = merge_all_content(data)
+        model = _get_gemini_model(api_key)
         
-        # Limiter taille
-        if len(texte_unifie) > 12000:
-            texte_unifie = texte_unifie[:12000] + "...[tronqué]"
-        
-        # Emails pré-extraits (regex)
-        emails_page = extract_emails_regex(data.get('texte_complet', ''))
-        emails_fichiers = []
-        for f in data.get('fichiers_attaches', []):
-            emails_fichiers.extend(f.get('emails_fichier', []))
+        # PATCH v1.9: Merge tout le contenu + emails pré-extraits (regex)
+        pre = _preprocess(data)
+        texte_unifie = pre['texte_unifie']
+        emails_page = pre['emails_page']
+        emails_fichiers = pre['emails_fichiers']
         
         # PATCH v1.9: Prompt simplifié
-        prompt = f"""Tu es un extracteur de données. Analyse le texte ci-dessous et extrait UNIQUEMENT:
-
-1. ORGANISATION: Le nom EXACT et COMPLET de l'entité qui publie cette offre.
-   - Copie le nom tel qu'il apparaît, sans abréger ni reformuler.
-   - Cherche: Association, Fondation, ONG, Direction, Ministère, etc.
-
-2. EMAILS: Tous les emails de contact trouvés.
-
-RÈGLES STRICTES:
-- NE PAS inventer. Si non trouvé, mettre "Non spécifié".
-- NE PAS résumer ou interpréter. Copier EXACTEMENT.
-- Répondre UNIQUEMENT en JSON valide, sans markdown.
-
-=== TEXTE À ANALYSER ===
-
-{texte_unifie}
-
-=== FIN DU TEXTE ===
-
-Réponds avec ce JSON uniquement:
-{{"organisation": "...", "emails": ["...", "..."], "secteur": "Autre", "type_opportunite": "Offre", "localisation": "Non spécifié", "resume": "...", "mots_cles": []}}
-"""
+        prompt = _EXTRACTION_PROMPT_PREFIX + texte_unifie + _EXTRACTION_PROMPT_SUFFIX
         
         response = model.generate_content(prompt)
-        response_text = clean_json_response(response.text.strip())
-        result = json.loads(response_text)
+        result = _parse_analysis_response(response.text)
         
         # PATCH v1.9: Fusionner et normaliser emails
         emails_ia = result.get('emails', [])
-        all_emails = normalize_and_dedup_emails(emails_page + emails_fichiers, emails_ia)
+        all_emails = _merge_emails(emails_page, emails_fichiers, emails_ia)
         result['emails'] = all_emails
         
+        save_analysis_to_cache(f"gemini_{pre['content_hash']}", result)
         return result
         
     except Exception as e:
@@ -420,46 +629,16 @@ Réponds avec ce JSON uniquement:
 def analyze_with_claude(data: Dict, api_key: str) -> Dict:
     """Analyse avec Claude (v1.9 - texte unifié)."""
     try:
-        import anthropic
-        
-        client = anthropic.Anthropic(api_key=api_key)
+        client = _get_claude_client(api_key)
         
-        # PATCH v1.9: Merge tout le contenu
-        texte_unifie = merge_all_content(data)
-        
-        # Limiter taille
-        if len(texte_unifie) > 12000:
-            texte_unifie = texte_unifie[:12000] + "...[tronqué]"
-        
-        # Emails pré-extraits (regex)
-        emails_page = extract_emails_regex(data.get('texte_complet', ''))
-        emails_fichiers = []
-        for f in data.get('fichiers_attaches', []):
-            emails_fichiers.extend(f.get('emails_fichier', []))
+        # PATCH v1.9: Merge tout le contenu + emails pré-extraits (regex)
+        pre = _preprocess(data)
+        texte_unifie = pre['texte_unifie']
+        emails_page = pre['emails_page']
+        emails_fichiers = pre['emails_fichiers']
         
         # PATCH v1.9: Prompt simplifié
-        prompt = f"""Tu es un extracteur de données. Analyse le texte ci-dessous et extrait UNIQUEMENT:
-
-1. ORGANISATION: Le nom EXACT et COMPLET de l'entité qui publie cette offre.
-   - Copie le nom tel qu'il apparaît, sans abréger ni reformuler.
-   - Cherche: Association, Fondation, ONG, Direction, Ministère, etc.
-
-2. EMAILS: Tous les emails de contact trouvés.
-
-RÈGLES STRICTES:
-- NE PAS inventer. Si non trouvé, mettre "Non spécifié".
-- NE PAS résumer ou interpréter. Copier EXACTEMENT.
-- Répondre UNIQUEMENT en JSON valide, sans markdown.
-
-=== TEXTE À ANALYSER ===
-
-{texte_unifie}
-
-=== FIN DU TEXTE ===
-
-Réponds avec ce JSON uniquement:
-{{"organisation": "...", "emails": ["...", "..."], "secteur": "Autre", "type_opportunite": "Offre", "localisation": "Non spécifié", "resume": "...", "mots_cles": []}}
-"""
+        prompt = _EXTRACTION_PROMPT_PREFIX + texte_unifie + _EXTRACTION_PROMPT_SUFFIX
         
         message = client.messages.create(
             model="claude-sonnet-4-20250514",
@@ -468,14 +647,14 @@ Réponds avec ce JSON uniquement:
             messages=[{"role": "user", "content": prompt}]
         )
         
-        response_text = clean_json_response(message.content[0].text.strip())
-        result = json.loads(response_text)
+        result = _parse_analysis_response(message.content[0].text)
         
         # PATCH v1.9: Fusionner et normaliser emails
         emails_ia = result.get('emails', [])
-        all_emails = normalize_and_dedup_emails(emails_page + emails_fichiers, emails_ia)
+        all_emails = _merge_emails(emails_page, emails_fichiers, emails_ia)
         result['emails'] = all_emails
         
+        save_analysis_to_cache(f"claude_{pre['content_hash']}", result)
         return result
         
     except Exception as e:
@@ -483,6 +662,310 @@ Réponds avec ce JSON uniquement:
         return create_fallback_analysis(data)
 
 
+# ============================================================================
+# ANALYSE PAR LOTS (plusieurs opportunités par requête)
+# ============================================================================
+
+def _generate_batch_text(prompt: str, api_key: str, ai_type: str, max_tokens: int) -> str:
+    """Envoie un prompt de lot au LLM et retourne le texte brut."""
+    if ai_type == "claude":
+        message = _get_claude_client(api_key).messages.create(
+            model="claude-sonnet-4-20250514",
+            max_tokens=max_tokens,
+            temperature=0.1,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return message.content[0].text.strip()
+    
+    response = _get_gemini_model(api_key).generate_content(
+        prompt,
+        generation_config={'max_output_tokens': max_tokens}
+    )
+    return response.text.strip()
+
+
+def _create_async_llm(api_key: str, ai_type: str):
+    """
+    Crée le client async d'un run (un par asyncio.run).
+    
+    Les clients async sont liés à leur boucle d'événements: ils ne peuvent
+    pas être mis en cache au niveau du module comme les clients sync.
+    """
+    if ai_type == "claude":
+        import anthropic
+        
+        return anthropic.AsyncAnthropic(api_key=api_key)
+    
+    import google.generativeai as genai
+    
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(
+        model_name='gemini-2.0-flash',
+        generation_config=GEMINI_GENERATION_CONFIG
+    )
+
+
+async def _generate_batch_text_async(prompt: str, llm, ai_type: str, max_tokens: int) -> str:
+    """Version asynchrone de _generate_batch_text (SDK async Claude/Gemini)."""
+    if ai_type == "claude":
+        message = await llm.messages.create(
+            model="claude-sonnet-4-20250514",
+            max_tokens=max_tokens,
+            temperature=0.1,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return message.content[0].text.strip()
+    
+    response = await llm.generate_content_async(
+        prompt,
+        generation_config={'max_output_tokens': max_tokens}
+    )
+    return response.text.strip()
+
+
+def _split_pending(data_list: List[Dict], ai_type: str, batch_size: int) -> Tuple[List[Optional[Dict]], List[List[int]]]:
+    """Sépare les opportunités déjà en cache des lots à envoyer au LLM."""
+    results: List[Optional[Dict]] = [None] * len(data_list)
+    pending = []
+    
+    for idx, data in enumerate(data_list):
+        pre = _preprocess(data)
+        cached = load_analysis_from_cache(f"{ai_type}_{pre['content_hash']}")
+        if cached is not None:
+            results[idx] = cached
+        else:
+            pending.append(idx)
+    
+    chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    return results, chunks
+
+
+def _build_batch_prompt(items: List[Dict]) -> str:
+    """Construit le prompt d'un lot: une balise <doc id="N"> par opportunité."""
+    docs = []
+    for doc_id, data in enumerate(items, 1):
+        texte_unifie = _preprocess(data)['texte_unifie']
+        docs.append(f'<doc id="{doc_id}">\n{texte_unifie}\n</doc>')
+    return _BATCH_PROMPT_PREFIX + '\n\n'.join(docs) + _BATCH_PROMPT_SUFFIX.format(nb=len(items))
+
+
+def _parse_batch_response(items: List[Dict], response_text: str, ai_type: str) -> List[Optional[Dict]]:
+    """
+    Découpe la réponse JSON d'un lot en analyses individuelles.
+    
+    Returns:
+        Une analyse par item, ou None si l'item manque dans la réponse
+    """
+    by_id: Dict[str, Dict] = {}
+    try:
+        parsed = _parse_json_response(response_text)
+        if isinstance(parsed, list):
+            by_id = {str(item.get('id')): item for item in parsed if isinstance(item, dict)}
+    except Exception as e:
+        print(f"❌ Erreur lecture lot {ai_type}: {e}")
+    
+    results: List[Optional[Dict]] = []
+    for doc_id, data in enumerate(items, 1):
+        result = by_id.get(str(doc_id))
+        if result is not None:
+            try:
+                result = _validate_analysis(result)
+            except Exception as e:
+                print(f"⚠️ Réponse lot invalide (doc {doc_id}): {e}")
+                result = None
+        if result is None:
+            results.append(None)
+            continue
+        
+        result.pop('id', None)
+        pre = _preprocess(data)
+        result['emails'] = _merge_emails(
+            pre['emails_page'],
+            pre['emails_fichiers'],
+            result.get('emails', [])
+        )
+        save_analysis_to_cache(f"{ai_type}_{pre['content_hash']}", result)
+        results.append(result)
+    
+    return results
+
+
+def analyze_opportunities_batch(
+    data_list: List[Dict],
+    api_key: str,
+    ai_type: str = "claude",
+    batch_size: int = 8
+) -> List[Dict]:
+    """
+    Analyse plusieurs opportunités en regroupant jusqu'à batch_size annonces par appel IA.
+    
+    Les opportunités déjà en cache ne sont pas renvoyées au LLM. Si un lot
+    échoue ou qu'une annonce manque dans la réponse, elle est réanalysée
+    individuellement via analyze_opportunity().
+    
+    Args:
+        data_list: Liste de données scrapées
+        api_key: Clé API
+        ai_type: "claude" ou "gemini"
+        batch_size: Nombre max d'annonces par requête
+    
+    Returns:
+        Liste d'analyses, dans le même ordre que data_list
+    """
+    results, chunks = _split_pending(data_list, ai_type, batch_size)
+    
+    for chunk in chunks:
+        items = [data_list[idx] for idx in chunk]
+        
+        if len(items) == 1:
+            chunk_results = [None] * len(items)
+        else:
+            try:
+                response_text = _generate_batch_text(_build_batch_prompt(items), api_key, ai_type, 1024 * len(items))
+                chunk_results = _parse_batch_response(items, response_text, ai_type)
+            except Exception as e:
+                print(f"❌ Erreur lot {ai_type}: {e}")
+                chunk_results = [None] * len(items)
+        
+        for idx, result in zip(chunk, chunk_results):
+            results[idx] = result if result is not None else analyze_opportunity(data_list[idx], api_key, ai_type)
+    
+    return results
+
+
+async def analyze_opportunities_async(
+    data_list: List[Dict],
+    api_key: str,
+    ai_type: str = "claude",
+    batch_size: int = 8,
+    max_concurrent: int = 8,
+    progress_callback: Optional[Callable[[int, int], None]] = None
+) -> List[Dict]:
+    """
+    Comme analyze_opportunities_batch, mais envoie les lots en parallèle.
+    
+    Jusqu'à max_concurrent requêtes sont en vol simultanément (Semaphore),
+    pour respecter les limites de débit des API.
+    
+    Args:
+        progress_callback: Appelé avec (terminées, total) à chaque analyse
+            terminée (cache compris), dans le thread de la boucle asyncio
+    
+    Returns:
+        Liste d'analyses, dans le même ordre que data_list
+    """
+    results, chunks = _split_pending(data_list, ai_type, batch_size)
+    total = len(data_list)
+    done = total - sum(len(chunk) for chunk in chunks)
+    
+    def report(count: int) -> None:
+        nonlocal done
+        done += count
+        if progress_callback:
+            progress_callback(done, total)
+    
+    report(0)
+    if not chunks:
+        return results
+    
+    try:
+        llm = _create_async_llm(api_key, ai_type)
+    except Exception as e:
+        print(f"❌ Erreur client async {ai_type}: {e}")
+        llm = None
+    semaphore = asyncio.Semaphore(max_concurrent)
+    
+    async def run_chunk(chunk: List[int]) -> None:
+        items = [data_list[idx] for idx in chunk]
+        
+        async with semaphore:
+            if len(items) == 1 or llm is None:
+                chunk_results = [None] * len(items)
+            else:
+                try:
+                    response_text = await _generate_batch_text_async(
+                        _build_batch_prompt(items), llm, ai_type, 1024 * len(items)
+                    )
+                    chunk_results = _parse_batch_response(items, response_text, ai_type)
+                except Exception as e:
+                    print(f"❌ Erreur lot {ai_type}: {e}")
+                    chunk_results = [None] * len(items)
+            
+            for idx, result in zip(chunk, chunk_results):
+                if result is None:
+                    result = await asyncio.to_thread(analyze_opportunity, data_list[idx], api_key, ai_type)
+                results[idx] = result
+                report(1)
+    
+    # Un lot en échec ne fait pas échouer les autres
+    outcomes = await asyncio.gather(*(run_chunk(chunk) for chunk in chunks), return_exceptions=True)
+    
+    for chunk, outcome in zip(chunks, outcomes):
+        if isinstance(outcome, BaseException):
+            print(f"❌ Erreur lot {ai_type}: {outcome}")
+            missing = [idx for idx in chunk if results[idx] is None]
+            for idx in missing:
+                results[idx] = create_fallback_analysis(data_list[idx])
+            report(len(missing))
+    
+    return results
+
+
+# ============================================================================
+# SCHÉMA RÉPONSE IA (validation pydantic)
+# ============================================================================
+
+if BaseModel is not None:
+    class AnalysisResult(BaseModel):
+        """Réponse attendue de l'IA pour une opportunité."""
+        organisation: Optional[str] = 'Non spécifié'
+        emails: Optional[List[str]] = []
+        secteur: Optional[str] = 'Autre'
+        type_opportunite: Optional[str] = 'Non déterminé'
+        localisation: Optional[str] = 'Non spécifié'
+        resume: Optional[str] = ''
+        mots_cles: Optional[List[str]] = []
+        
+        @field_validator('*', mode='before')
+        @classmethod
+        def _null_to_default(cls, value, info):
+            """Un champ null de l'IA prend la valeur par défaut (le reste de la réponse est conservé)."""
+            if value is None:
+                return cls.model_fields[info.field_name].get_default(call_default_factory=True)
+            return value
+    
+    # Construit une seule fois: le coût de build du validateur est amorti sur tous les appels
+    _RESULT_ADAPTER = TypeAdapter(AnalysisResult)
+else:
+    _RESULT_ADAPTER = None
+
+
+def _validate_analysis(obj) -> Dict:
+    """Valide un dict de réponse IA contre AnalysisResult (lève une erreur si invalide)."""
+    if _RESULT_ADAPTER is None:
+        if not isinstance(obj, dict):
+            raise ValueError("Réponse IA: objet JSON attendu")
+        return obj
+    return _RESULT_ADAPTER.validate_python(obj).model_dump()
+
+
+def _parse_analysis_response(text: str) -> Dict:
+    """
+    Décode et valide la réponse IA d'une opportunité.
+    
+    Cas courant (JSON pur): parsing + validation en une étape via
+    validate_json. Sinon, extraction du JSON puis validation.
+    """
+    if _RESULT_ADAPTER is not None:
+        stripped = text.strip()
+        if stripped.startswith('{'):
+            try:
+                return _RESULT_ADAPTER.validate_json(stripped).model_dump()
+            except ValidationError:
+                pass
+    return _validate_analysis(_parse_json_response(text))
+
+
 # ============================================================================
 # UTILITAIRES
 # ============================================================================
@@ -498,6 +981,36 @@ def clean_json_response(text: str) -> str:
     return text.strip()
 
 
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _parse_json_response(text: str):
+    """
+    Décode le premier objet (ou tableau) JSON de la réponse IA.
+    
+    raw_decode démarre directement au premier '{' / '[' et ignore ce qui
+    suit (fences markdown, commentaire): pas de split ni de copie. Repli
+    sur clean_json_response si le décodage échoue.
+    """
+    # Cas courant: réponse = JSON pur -> orjson
+    if orjson is not None:
+        stripped = text.strip()
+        if stripped[:1] in ('{', '['):
+            try:
+                return orjson.loads(stripped)
+            except orjson.JSONDecodeError:
+                pass
+    
+    starts = [i for i in (text.find('{'), text.find('[')) if i != -1]
+    if starts:
+        try:
+            obj, _ = _JSON_DECODER.raw_decode(text, min(starts))
+            return obj
+        except ValueError:
+            pass
+    return json.loads(clean_json_response(text))
+
+
 def extract_emails_regex(text: str) -> List[str]:
     """Extraction emails par regex (fallback)."""
     if not text:
@@ -505,28 +1018,20 @@ def extract_emails_regex(text: str) -> List[str]:
     
     emails = set()
     
-    # Standard
-    pattern1 = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    emails.update(re.findall(pattern1, text))
-    
-    # Avec espaces
-    pattern2 = r'\b([A-Za-z0-9._%+-]+)\s*@\s*([A-Za-z0-9.-]+)\s*\.\s*([A-Z|a-z]{2,})\b'
-    for match in re.finditer(pattern2, text):
-        emails.add(f"{match.group(1)}@{match.group(2)}.{match.group(3)}")
-    
-    # AT/DOT
-    pattern3 = r'\b([A-Za-z0-9._%+-]+)\s+(?:at|AT)\s+([A-Za-z0-9.-]+)\s+(?:dot|DOT)\s+([A-Z|a-z]{2,})\b'
-    for match in re.finditer(pattern3, text):
-        emails.add(f"{match.group(1)}@{match.group(2)}.{match.group(3)}")
-    
-    # [at] [dot]
-    pattern4 = r'\b([A-Za-z0-9._%+-]+)\s*\[at\]\s*([A-Za-z0-9.-]+)\s*\[dot\]\s*([A-Z|a-z]{2,})\b'
-    for match in re.finditer(pattern4, text, re.IGNORECASE):
-        emails.add(f"{match.group(1)}@{match.group(2)}.{match.group(3)}")
+    for m in _EMAIL_ANY.finditer(text):
+        kind = m.lastgroup
+        if kind == 'std':
+            emails.add(m.group('std'))
+        elif kind == 'spaced':
+            emails.add(f"{m.group('sp_user')}@{m.group('sp_dom')}.{m.group('sp_tld')}")
+        elif kind == 'atdot':
+            emails.add(f"{m.group('at_user')}@{m.group('at_dom')}.{m.group('at_tld')}")
+        elif kind == 'bracket':
+            emails.add(f"{m.group('br_user')}@{m.group('br_dom')}.{m.group('br_tld')}")
     
     cleaned = []
     for email in emails:
-        email = re.sub(r'\s+', '', email).lower()
+        email = email.translate(_WS_TABLE).lower()
         if '@' in email and '.' in email.split('@')[1]:
             cleaned.append(email)
     
@@ -568,7 +1073,12 @@ def test_analyzer():
     emails = get_all_emails_from_files(test_data['fichiers_attaches'])
     print(f"   {emails}")
     
-    print("\n3. Fallback analysis:")
+    print("\n3. Emails obfusqués:")
+    assert extract_emails_regex("contact AT alcs DOT ma") == ['contact@alcs.ma']
+    assert extract_emails_regex("Rendez-vous At Rabat Dot Com") == []  # Prose en casse mixte
+    print("   OK")
+    
+    print("\n4. Fallback analysis:")
     fallback = create_fallback_analysis(test_data)
     print(f"   Emails fusionnés: {fallback['emails']}")
     
@@ -14,10 +14,11 @@ import pandas as pd
 from datetime import datetime
 import sys
 import traceback
+import asyncio
 
 # Import modules locaux
 from scraper import scrape_tanmia
-from analyzer import analyze_opportunity
+from analyzer import analyze_opportunities_async
 from utils import (
     export_to_excel,
     create_export_filename,
@@ -30,6 +31,11 @@ import json
 import hashlib
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # Repli sur json standard
+    orjson = None
+
 
 # ============================================================================
 # SYSTÈME DE CACHE JSON
@@ -56,6 +62,9 @@ def save_to_cache(cache_key: str, scraped_data: list, analysis_results: list):
         'timestamp': datetime.now().isoformat(),
         'version': '1.8'
     }
+    if orjson is not None:
+        cache_file.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        return
     with open(cache_file, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
@@ -65,6 +74,8 @@ def load_from_cache(cache_key: str) -> dict:
     cache_file = CACHE_DIR / f"{cache_key}.json"
     if cache_file.exists():
         try:
+            if orjson is not None:
+                return orjson.loads(cache_file.read_bytes())
             with open(cache_file, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except:
@@ -82,6 +93,9 @@ if 'analysis_results' not in st.session_state:
     st.session_state.analysis_results = None
 if 'df' not in st.session_state:
     st.session_state.df = None
+# Incrémenté à chaque nouvelle affectation des résultats (clé d'invalidation du DataFrame)
+if 'results_generation' not in st.session_state:
+    st.session_state.results_generation = 0
 
 
 # ============================================================================
@@ -235,7 +249,7 @@ with st.sidebar:
     if parse_files:
         st.markdown("---")
         st.caption("**Dépendances requises:**")
-        st.code("pip install pdfplumber python-docx", language="bash")
+        st.code("pip install pymupdf python-docx", language="bash")
 
 
 # ============================================================================
@@ -274,6 +288,7 @@ with col_btn2:
         if st.button("🗑️ Réinitialiser", use_container_width=True):
             st.session_state.scraped_data = None
             st.session_state.analysis_results = None
+            st.session_state.results_generation += 1
             st.session_state.df = None
             st.rerun()
 
@@ -290,14 +305,18 @@ if launch_button and api_valid:
         st.success("💾 Données en cache! Chargement instantané...")
         st.session_state.scraped_data = cached_data['scraped_data']
         st.session_state.analysis_results = cached_data['analysis_results']
+        st.session_state.results_generation += 1
     else:
         try:
             progress_bar = st.progress(0)
             status_text = st.empty()
             status_container = st.empty()
             
+            # Max ~50 rafraîchissements par phase (chaque appel = un aller-retour websocket):
+            # scrape_tanmia n'appelle le callback que tous les total//50 éléments et au dernier
+            # Phase 1 sur la première moitié de la barre, la phase 2 reprend à 0.5
             def update_progress(progress, message):
-                progress_bar.progress(progress)
+                progress_bar.progress(progress * 0.5)
                 status_text.text(message)
             
             # Phase 1: Scraping + Parsing fichiers
@@ -305,24 +324,23 @@ if launch_button and api_valid:
             with status_container:
                 st.info(f"🕷️ **PHASE 1/2:** Scraping ({parse_label})...")
             
+            scrape_stats = {}
             scraped_data = scrape_tanmia(
                 url_type=url_type,
                 max_pages=max_pages,
                 progress_callback=update_progress,
-                parse_attachments=parse_files  # v1.8
+                parse_attachments=parse_files,  # v1.8
+                stats=scrape_stats
             )
             
             if not scraped_data or len(scraped_data) == 0:
                 st.error("❌ Aucune opportunité trouvée.")
                 st.stop()
             
-            # Stats rapides (v1.8)
-            total_fichiers = sum(len(d.get('fichiers_attaches', [])) for d in scraped_data)
-            total_parses = sum(
-                sum(1 for f in d.get('fichiers_attaches', []) if f.get('contenu_texte'))
-                for d in scraped_data
-            )
-            total_emails_files = sum(len(d.get('emails_from_files', [])) for d in scraped_data)
+            # Stats rapides (v1.8), accumulées pendant le scraping
+            total_fichiers = scrape_stats['total_fichiers']
+            total_parses = scrape_stats['total_parses']
+            total_emails_files = scrape_stats['total_emails_files']
             
             with status_container:
                 st.info(f"📎 {total_fichiers} fichiers | {total_parses} parsés | {total_emails_files} emails extraits")
@@ -331,37 +349,35 @@ if launch_button and api_valid:
             with status_container:
                 st.info(f"🤖 **PHASE 2/2:** Analyse IA ({ai_label})...")
             
-            analysis_results = []
+            # Lots de 8 annonces, jusqu'à 8 requêtes IA en parallèle
+            nb_emails_f = total_emails_files
+            emails_info = f" | 📧 {nb_emails_f} email(s) fichiers" if nb_emails_f > 0 else ""
+            status_text.text(f"🤖 {len(scraped_data)} opportunités en cours d'analyse...{emails_info}")
             
-            for idx, item in enumerate(scraped_data):
-                progress = 0.5 + ((idx + 1) / len(scraped_data)) * 0.5
-                progress_bar.progress(progress)
-                
-                titre_short = item['titre'][:40]
-                nb_emails_f = len(item.get('emails_from_files', []))
-                emails_info = f" | 📧 {nb_emails_f} email(s) fichiers" if nb_emails_f > 0 else ""
-                status_text.text(f"🤖 {idx+1}/{len(scraped_data)}: {titre_short}...{emails_info}")
-                
-                try:
-                    analysis = analyze_opportunity(item, api_key, ai_type)
-                    analysis_results.append(analysis)
-                except Exception as e:
-                    st.warning(f"⚠️ Erreur analyse: {titre_short}")
-                    analysis_results.append({
-                        'organisation': 'Erreur',
-                        'emails': item.get('emails_from_files', []),  # Au moins ceux des fichiers
-                        'secteur': 'Autre',
-                        'type_opportunite': 'Non déterminé',
-                        'localisation': 'Non spécifié',
-                        'resume': item.get('texte_complet', '')[:200],
-                        'mots_cles': []
-                    })
+            # Même règle par comptage que la phase 1
+            def update_analysis_progress(done, total):
+                if done % max(1, total // 50) and done != total:
+                    return
+                progress_bar.progress(0.5 + (done / total) * 0.5)
+                status_text.text(f"🤖 {done}/{total} opportunités analysées...{emails_info}")
+            
+            analysis_results = asyncio.run(
+                analyze_opportunities_async(
+                    scraped_data,
+                    api_key,
+                    ai_type,
+                    batch_size=8,
+                    max_concurrent=8,
+                    progress_callback=update_analysis_progress
+                )
+            )
             
             progress_bar.empty()
             status_text.empty()
             
             st.session_state.scraped_data = scraped_data
             st.session_state.analysis_results = analysis_results
+            st.session_state.results_generation += 1
             
             save_to_cache(cache_key, scraped_data, analysis_results)
             
@@ -376,13 +392,34 @@ if launch_button and api_valid:
 # AFFICHAGE RÉSULTATS
 # ============================================================================
 
+RESULTS_PAGE_SIZE = 100  # Lignes par page du tableau principal
+
 if st.session_state.scraped_data:
-    merged_data = merge_analysis_results(
-        st.session_state.scraped_data,
-        st.session_state.analysis_results
-    )
-    st.session_state.df = pd.DataFrame(merged_data)
+    # DataFrame + masques des onglets recalculés seulement quand les données changent
+    # (pas à chaque rerun Streamlit déclenché par un widget). Clé = compteur de génération:
+    # un id() peut être réutilisé par Python après libération de l'ancien objet
+    df_source = st.session_state.results_generation
+    if st.session_state.get('df_source') != df_source or st.session_state.df is None:
+        merged_data = merge_analysis_results(
+            st.session_state.scraped_data,
+            st.session_state.analysis_results
+        )
+        # Colonnes Arrow natives: sérialisation st.dataframe sans inspection objet par cellule
+        df = pd.DataFrame(merged_data)
+        df = df.astype({
+            col: 'Int32' if col in ('Nb_Fichiers', 'Nb_Parses') else 'string[pyarrow]'
+            for col in df.columns
+        })
+        st.session_state.df = df
+        st.session_state.df_masks = {
+            'email': df['Email'].str.len().gt(0).to_numpy(dtype=bool, na_value=False),
+            'fichiers': df['Nb_Fichiers'].gt(0).to_numpy(dtype=bool, na_value=False),
+            'parses': df['Nb_Parses'].gt(0).to_numpy(dtype=bool, na_value=False),
+        }
+        st.session_state.df_source = df_source
+    
     df = st.session_state.df
+    masks = st.session_state.df_masks
     
     st.success(f"✅ **TERMINÉ:** {len(df)} opportunités analysées")
     
@@ -438,8 +475,23 @@ if st.session_state.scraped_data:
     ])
     
     with tab1:
+        # Pagination: seules les lignes de la page courante sont envoyées au navigateur
+        df_page = df
+        if len(df) > RESULTS_PAGE_SIZE:
+            nb_pages = (len(df) - 1) // RESULTS_PAGE_SIZE + 1
+            page = st.number_input(
+                f"Page (sur {nb_pages})",
+                min_value=1,
+                max_value=nb_pages,
+                value=1,
+                step=1
+            )
+            start = (page - 1) * RESULTS_PAGE_SIZE
+            df_page = df.iloc[start:start + RESULTS_PAGE_SIZE]
+            st.caption(f"Lignes {start + 1}–{start + len(df_page)} sur {len(df)}")
+        
         st.dataframe(
-            df,
+            df_page,
             column_config={
                 "URL": st.column_config.LinkColumn("🔗", width="small"),
                 "Organisation": st.column_config.TextColumn("🏢 Org", width="medium"),
@@ -454,14 +506,14 @@ if st.session_state.scraped_data:
         )
     
     with tab2:
-        df_emails = df[df['Email'].str.len() > 0]
+        df_emails = df.loc[masks['email']]
         if len(df_emails) > 0:
             st.dataframe(df_emails, use_container_width=True, height=500)
         else:
             st.info("Aucune opportunité avec email")
     
     with tab3:
-        df_files = df[df['Nb_Fichiers'] > 0]
+        df_files = df.loc[masks['fichiers']]
         if len(df_files) > 0:
             st.success(f"📎 {len(df_files)} opportunités avec fichiers")
             st.dataframe(df_files[['Organisation', 'Titre', 'Fichiers', 'Nb_Fichiers', 'Nb_Parses', 'Emails_Fichiers']], height=500)
@@ -470,7 +522,7 @@ if st.session_state.scraped_data:
     
     # NOUVEAU v1.8: Onglet fichiers parsés
     with tab4:
-        df_parsed = df[df['Nb_Parses'] > 0]
+        df_parsed = df.loc[masks['parses']]
         if len(df_parsed) > 0:
             st.success(f"📥 {len(df_parsed)} opportunités avec fichiers parsés")
             st.dataframe(
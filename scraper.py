@@ -4,21 +4,67 @@ Extraction robuste avec PARSING COMPLET des fichiers attachés (PDF, DOC, DOCX)
 
 CHANGELOG v1.8:
 - NOUVEAU: download_and_parse_attachment() - Télécharge et extrait le texte
-- NOUVEAU: Support PDF (pdfplumber), DOCX (python-docx), DOC (antiword fallback)
+- NOUVEAU: Support PDF (PyMuPDF, fallback pdfplumber), DOCX (python-docx), DOC (antiword fallback)
 - NOUVEAU: Champ 'contenu_texte' dans fichiers_attaches
 - NOUVEAU: Extraction emails depuis contenu fichiers
 - Limite: 5000 chars/fichier pour éviter surcharge IA
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING
 from bs4 import BeautifulSoup
 import time
 import random
 import re
 import os
+import json
+import shutil
+import subprocess
+import functools
+import contextlib
+import threading
+import hashlib
+import codecs
 import tempfile
-from typing import List, Dict, Optional, Set, Tuple
-from urllib.parse import urljoin
+import logging
+import logging.handlers
+import queue
+import sys
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Optional, Set, Tuple, Union
+from urllib.parse import urljoin, urlparse
 from io import BytesIO
+from pathlib import Path
+
+try:
+    import pymupdf as fitz  # PyMuPDF >= 1.24
+except ImportError:
+    try:
+        import fitz  # PyMuPDF (ancien nom de module)
+    except ImportError:
+        fitz = None
+
+try:
+    import pypdfium2  # Alternative Apache/BSD à PyMuPDF (AGPL)
+except ImportError:
+    pypdfium2 = None
+
+try:
+    import requests_cache
+except ImportError:
+    requests_cache = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser  # selectolax < 1.0 sans Lexbor
+    except ImportError:
+        HTMLParser = None
 
 
 # ============================================================================
@@ -32,7 +78,18 @@ USER_AGENTS = [
 ]
 
 TIMEOUT = 30
+MAX_HTML_BYTES = 512 * 1024  # Pages HTML lues au plus jusqu'à 512KB (texte tronqué à 12000 chars)
+
+# Scraping concurrent des pages détail, avec plafond de requêtes simultanées par hôte
+MAX_DETAIL_WORKERS = 12
+MAX_REQUESTS_PER_HOST = 4
+
+# Cache HTTP transparent (requests-cache): 'sqlite' en local, 'redis' en multi-utilisateurs
+HTTP_CACHE_NAME = 'cache_scraping/tanmia_http'
+HTTP_CACHE_BACKEND = 'sqlite'
+HTTP_CACHE_EXPIRE = 86400  # 24h
 DOWNLOAD_TIMEOUT = 60  # Plus long pour fichiers volumineux
+CONNECT_TIMEOUT = 5  # Hôte de fichier injoignable: abandon rapide, sans bloquer un worker 60s
 
 # Extensions de fichiers à détecter
 VALID_FILE_EXTENSIONS = [
@@ -43,11 +100,87 @@ VALID_FILE_EXTENSIONS = [
     '.odt', '.ods', '.odp'
 ]
 
+# Sélecteurs des liens fichiers, combinés en un seul groupe CSS (une traversée du DOM)
+ATTACHMENT_SELECTORS = [
+    'ul.post-attachments a',
+    'ul.wp-block-file a',
+    'div.wp-block-file a',
+    'a.attachment-link',
+    'a.wp-block-file__button',
+    'div.elementor-widget-attachment a',
+    'div.elementor-widget-icon-list a',
+    'a.download-link',
+    'a[download]',
+] + [
+    f'a[href$="{e}"]' for ext in VALID_FILE_EXTENSIONS for e in (ext, ext.upper())
+]
+ATTACHMENT_SELECTOR = ', '.join(ATTACHMENT_SELECTORS)
+
+# Extensions sans point, pour un test d'appartenance O(1)
+_VALID_EXT_SET = {e.lstrip('.').lower() for e in VALID_FILE_EXTENSIONS}
+
+# Exclus du cache HTTP: les listings (nouvelles offres visibles à chaque run) et les
+# fichiers attachés (requests-cache lirait tout le corps avant les plafonds du streaming)
+HTTP_CACHE_SKIP_URLS = [
+    re.compile(re.escape(BASE_URL) + r'/(appels-doffres|offres-demploi)/(\d+/)?$'),
+    '*/wp-content/uploads/',
+    re.compile(r'\.(' + '|'.join(sorted(_VALID_EXT_SET)) + r')([?#]|$)', re.IGNORECASE),
+]
+
 # Extensions parsables (v1.8)
 PARSABLE_EXTENSIONS = ['.pdf', '.doc', '.docx']
 
 # Limite contenu fichier pour IA
 MAX_FILE_CONTENT_LENGTH = 5000
+MAX_PDF_PAGES = 20
+MAX_DOWNLOAD_SIZE = 10 * 1024 * 1024  # 10MB
+SPOOL_THRESHOLD = 1024 * 1024  # Au-delà: fichier temporaire (mmap PyMuPDF), en deçà: bytes en RAM
+
+# Contenu téléchargé: bytes (petits fichiers) ou chemin d'un fichier temporaire
+FileSource = Union[bytes, str]
+
+# Cache des fichiers parsés, par URL (réutilisé entre scrapes de paramètres différents)
+ATTACHMENT_CACHE_DIR = Path("cache_scraping") / "attachments"
+ATTACHMENT_CACHE_TTL = 7 * 86400  # 7 jours
+
+# Parsing parallèle des fichiers (PyMuPDF/antiword sont CPU/subprocess-bound)
+MAX_PARSE_WORKERS = min(os.cpu_count() or 1, 4)
+
+
+# ============================================================================
+# LOGGING
+# ============================================================================
+
+logger = logging.getLogger(__name__)
+_LOGGING_LOCK = threading.Lock()
+
+
+def _setup_logging() -> None:
+    """
+    Journal non bloquant: les threads de scraping déposent les messages dans
+    une file (QueueHandler), un thread d'arrière-plan (QueueListener) les écrit.
+    
+    Appelé au lancement d'un scraping, pas à l'import: les workers 'spawn' du
+    pool de parsing ré-importent le module et gardent print().
+    """
+    if multiprocessing.current_process().name != 'MainProcess':
+        return
+    
+    with _LOGGING_LOCK:
+        if logger.handlers:  # Déjà configuré (scraping précédent)
+            return
+        
+        log_queue: queue.Queue = queue.Queue(-1)
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        
+        listener = logging.handlers.QueueListener(log_queue, handler)
+        listener.start()
+        atexit.register(listener.stop)
+        
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
 
 
 # ============================================================================
@@ -68,17 +201,197 @@ def human_delay(min_sec: float = 2.0, max_sec: float = 5.0) -> None:
     time.sleep(random.uniform(min_sec, max_sec))
 
 
+_HOST_SEMAPHORES: Dict[str, threading.Semaphore] = {}
+_HOST_SEMAPHORES_LOCK = threading.Lock()
+
+
+def _host_semaphore(url: str) -> threading.Semaphore:
+    """Sémaphore par hôte: au plus MAX_REQUESTS_PER_HOST requêtes en vol sur un même site."""
+    host = urlparse(url).netloc
+    with _HOST_SEMAPHORES_LOCK:
+        semaphore = _HOST_SEMAPHORES.get(host)
+        if semaphore is None:
+            semaphore = _HOST_SEMAPHORES[host] = threading.Semaphore(MAX_REQUESTS_PER_HOST)
+    return semaphore
+
+
+@contextlib.contextmanager
+def polite_get(session: requests.Session, url: str, **kwargs):
+    """
+    session.get en streaming, limité par hôte (partagé entre threads).
+    
+    Le sémaphore reste tenu jusqu'à la fermeture de la réponse: le corps se
+    télécharge dans la limite MAX_REQUESTS_PER_HOST, pas seulement les en-têtes.
+    """
+    with _host_semaphore(url):
+        response = session.get(url, stream=True, **kwargs)
+        try:
+            yield response
+        finally:
+            response.close()
+
+
+_CHARSET = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+def _decode_html(raw: bytes, content_type: str = '') -> str:
+    """
+    Décode une page HTML: charset HTTP, sinon <meta charset>, sinon UTF-8
+    (repli windows-1252). Lexbor lit toujours des bytes comme de l'UTF-8.
+    """
+    match = _CHARSET.search(content_type) or _META_CHARSET.search(raw[:2048])
+    if match:
+        encoding = match.group(1)
+        if isinstance(encoding, bytes):
+            encoding = encoding.decode('ascii')
+        try:
+            return raw.decode(encoding, errors='replace')
+        except LookupError:
+            pass  # Charset inconnu: détection ci-dessous
+    
+    try:
+        # final=False: un caractère coupé par la troncature MAX_HTML_BYTES n'est pas une erreur
+        return codecs.getincrementaldecoder('utf-8')().decode(raw)
+    except UnicodeDecodeError:
+        return raw.decode('windows-1252', errors='replace')
+
+
+def fetch_html(session: requests.Session, url: str) -> str:
+    """
+    Télécharge une page HTML en streaming, tronquée à MAX_HTML_BYTES,
+    et la décode selon son charset (voir _decode_html).
+    """
+    with polite_get(session, url, timeout=TIMEOUT) as response:
+        response.raise_for_status()
+        
+        buffer = bytearray()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            buffer.extend(chunk)
+            if len(buffer) >= MAX_HTML_BYTES:
+                break
+        
+        return _decode_html(bytes(buffer[:MAX_HTML_BYTES]), response.headers.get('Content-Type', ''))
+
+
+_SESSION: Optional[requests.Session] = None
+
+
 def create_session() -> requests.Session:
-    """Crée une session HTTP avec headers configurés."""
-    session = requests.Session()
+    """
+    Session HTTP partagée par tout le module (créée au premier appel).
+    
+    Keep-alive: listings, détails et fichiers réutilisent les connexions
+    TCP/TLS du pool au lieu d'un handshake par requête.
+    Cache HTTP transparent si requests-cache est installé.
+    """
+    global _SESSION
+    if _SESSION is not None:
+        return _SESSION
+    
+    if requests_cache is not None:
+        # Clé = méthode + URL + body: les User-Agent aléatoires n'invalident pas le cache
+        session = requests_cache.CachedSession(
+            HTTP_CACHE_NAME,
+            backend=HTTP_CACHE_BACKEND,
+            expire_after=HTTP_CACHE_EXPIRE,
+            allowable_methods=['GET'],
+            allowable_codes=[200],
+            match_headers=False,
+            urls_expire_after={pattern: requests_cache.DO_NOT_CACHE for pattern in HTTP_CACHE_SKIP_URLS},
+        )
+    else:
+        session = requests.Session()
+    
+    adapter = HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=64,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504]
+        )
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
     session.headers.update(get_random_headers())
+    # gzip/deflate, + br/zstd si brotli/zstandard sont installés (décompression côté C par urllib3)
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+    
+    _SESSION = session
     return session
 
 
+# ============================================================================
+# PARSING HTML (selectolax Lexbor, fallback BeautifulSoup)
+# ============================================================================
+# Adaptateurs minimaux: le scraping reste indépendant du backend
+# (selectolax/Lexbor, 10-20x plus rapide en parsing + sélection CSS, ou BeautifulSoup+lxml).
+# Lexbor et Modest exposent la même API de noeud (css, css_first, attributes, text, decompose).
+
+def parse_html(html):
+    """Construit l'arbre HTML avec le backend disponible."""
+    if HTMLParser is not None:
+        return HTMLParser(html)
+    return BeautifulSoup(html, 'lxml')
+
+
+def _html_root(tree):
+    """Noeud racine sur lequel appeler les sélecteurs / l'extraction de texte."""
+    return tree.root if HTMLParser is not None else tree
+
+
+def _css(node, selector: str) -> list:
+    return node.css(selector) if HTMLParser is not None else node.select(selector)
+
+
+def _css_first(node, selector: str):
+    return node.css_first(selector) if HTMLParser is not None else node.select_one(selector)
+
+
+def _attr(node, name: str) -> Optional[str]:
+    return node.attributes.get(name) if HTMLParser is not None else node.get(name)
+
+
+def _text(node, separator: str = '') -> str:
+    """Texte du noeud, fragments strippés et joints par separator."""
+    if HTMLParser is not None:
+        return node.text(separator=separator, strip=True)
+    return node.get_text(separator=separator, strip=True)
+
+
+def _iter_text(node):
+    """
+    Fragments de texte strippés et non vides, dans l'ordre du document, produits
+    à la demande (les noeuds blancs ne comptent pas dans un budget de caractères).
+    """
+    if HTMLParser is not None:
+        for child in node.traverse(include_text=True):
+            if child.tag == '-text':
+                fragment = child.text_content.strip()
+                if fragment:
+                    yield fragment
+    else:
+        yield from node.stripped_strings
+
+
 # ============================================================================
 # EXTRACTION EMAILS DEPUIS TEXTE (v1.8)
 # ============================================================================
 
+# Regex précompilée: les 4 formats fusionnés en alternatives nommées, une seule passe.
+# IGNORECASE sauf at|AT / dot|DOT (?-i:): 'At'/'Dot' en casse mixte relèvent de la prose
+_EMAIL_ALL = re.compile(
+    r'(?P<std>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b)'
+    r'|(?P<spaced>\b(?P<sp_user>[A-Za-z0-9._%+-]+)\s*@\s*(?P<sp_dom>[A-Za-z0-9.-]+)\s*\.\s*(?P<sp_tld>[A-Za-z]{2,})\b)'
+    r'|(?P<atdot>\b(?P<at_user>[A-Za-z0-9._%+-]+)\s+(?-i:at|AT)\s+(?P<at_dom>[A-Za-z0-9.-]+)\s+(?-i:dot|DOT)\s+(?P<at_tld>[A-Za-z]{2,})\b)'
+    r'|(?P<bracket>\b(?P<br_user>[A-Za-z0-9._%+-]+)\s*\[at\]\s*(?P<br_dom>[A-Za-z0-9.-]+)\s*\[dot\]\s*(?P<br_tld>[A-Za-z]{2,})\b)',
+    re.IGNORECASE
+)
+_WHITESPACE = re.compile(r'\s+')
+# Préfiltre littéral: sans '@' ni 'dot', aucun des 4 formats ne peut matcher
+_DOT_HINT = re.compile(r'dot', re.IGNORECASE)
+
 def extract_emails_from_text(text: str) -> List[str]:
     """
     Extrait tous les emails d'un texte.
@@ -97,34 +410,26 @@ def extract_emails_from_text(text: str) -> List[str]:
     if not text:
         return []
     
-    emails = set()
-    
-    # Pattern standard
-    pattern1 = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    emails.update(re.findall(pattern1, text))
-    
-    # Pattern avec espaces
-    pattern2 = r'\b([A-Za-z0-9._%+-]+)\s*@\s*([A-Za-z0-9.-]+)\s*\.\s*([A-Z|a-z]{2,})\b'
-    for match in re.finditer(pattern2, text):
-        email = f"{match.group(1)}@{match.group(2)}.{match.group(3)}"
-        emails.add(email)
+    if '@' not in text and not _DOT_HINT.search(text):
+        return []
     
-    # Pattern AT/DOT
-    pattern3 = r'\b([A-Za-z0-9._%+-]+)\s+(?:at|AT)\s+([A-Za-z0-9.-]+)\s+(?:dot|DOT)\s+([A-Z|a-z]{2,})\b'
-    for match in re.finditer(pattern3, text):
-        email = f"{match.group(1)}@{match.group(2)}.{match.group(3)}"
-        emails.add(email)
+    emails = set()
     
-    # Pattern [at] [dot]
-    pattern4 = r'\b([A-Za-z0-9._%+-]+)\s*\[at\]\s*([A-Za-z0-9.-]+)\s*\[dot\]\s*([A-Z|a-z]{2,})\b'
-    for match in re.finditer(pattern4, text, re.IGNORECASE):
-        email = f"{match.group(1)}@{match.group(2)}.{match.group(3)}"
-        emails.add(email)
+    for m in _EMAIL_ALL.finditer(text):
+        kind = m.lastgroup
+        if kind == 'std':
+            emails.add(m.group('std'))
+        elif kind == 'spaced':
+            emails.add(f"{m.group('sp_user')}@{m.group('sp_dom')}.{m.group('sp_tld')}")
+        elif kind == 'atdot':
+            emails.add(f"{m.group('at_user')}@{m.group('at_dom')}.{m.group('at_tld')}")
+        elif kind == 'bracket':
+            emails.add(f"{m.group('br_user')}@{m.group('br_dom')}.{m.group('br_tld')}")
     
     # Nettoyage
     cleaned = []
     for email in emails:
-        email = re.sub(r'\s+', '', email).lower()
+        email = _WHITESPACE.sub('', email).lower()
         if '@' in email and '.' in email.split('@')[1]:
             cleaned.append(email)
     
@@ -135,23 +440,81 @@ def extract_emails_from_text(text: str) -> List[str]:
 # PARSING FICHIERS (NOUVEAU v1.8)
 # ============================================================================
 
-def parse_pdf_content(file_bytes: bytes) -> Tuple[str, List[str]]:
-    """Parse un fichier PDF."""
+def _read_pdf_pages(page_count: int, read_page) -> Tuple[List[str], List[str]]:
+    """
+    Lit les pages utiles d'un PDF, en commençant par celles qui portent les contacts.
+    
+    Pages 1, 2 et dernière d'abord: si elles contiennent déjà un email, on s'arrête.
+    Sinon lecture des pages intermédiaires (max 20 pages au total).
+    
+    Args:
+        page_count: Nombre de pages du document
+        read_page: Fonction index -> texte de la page
+    
+    Returns:
+        Tuple (textes des pages lues dans l'ordre du document, emails extraits):
+        chaque page n'est scannée qu'une fois, pas de second scan du texte joint
+    """
+    texts: Dict[int, str] = {}
+    
+    for i in sorted({0, 1, page_count - 1}):
+        if 0 <= i < page_count:
+            texts[i] = read_page(i) or ''
+    
+    emails = extract_emails_from_text('\n'.join(texts.values()))
+    if emails:
+        return list(texts.values()), emails
+    
+    # Aucun email en tête: seules les pages intermédiaires restent à scanner
+    middle = [read_page(i) or '' for i in range(2, min(MAX_PDF_PAGES - 1, page_count - 1))]
+    texts.update(zip(range(2, 2 + len(middle)), middle))
+    
+    return [texts[i] for i in sorted(texts)], extract_emails_from_text('\n'.join(middle))
+
+
+def parse_pdf_content(file_bytes: FileSource) -> Tuple[str, List[str]]:
+    """Parse un fichier PDF (PyMuPDF, sinon pypdfium2, sinon pdfplumber). Accepte bytes ou chemin."""
     try:
-        import pdfplumber
-        
-        text_parts = []
-        
-        with pdfplumber.open(BytesIO(file_bytes)) as pdf:
-            for page in pdf.pages[:20]:
-                page_text = page.extract_text()
-                if page_text:
-                    text_parts.append(page_text)
-        
-        full_text = '\n'.join(text_parts)
+        if fitz is not None:
+            if isinstance(file_bytes, str):
+                doc = fitz.open(file_bytes)  # mmap, pages chargées à la demande
+            else:
+                doc = fitz.open(stream=file_bytes, filetype="pdf")
+            try:
+                if doc.page_count == 0:
+                    return "", []
+                
+                # PDF scanné (images seules): aucun bloc texte en page 1, inutile de continuer
+                page0 = doc.load_page(0)
+                blocks = page0.get_text("blocks")
+                if not any(b[6] == 0 and b[4].strip() for b in blocks):
+                    print("      ⚠️ PDF image (scan) sans texte, ignoré")
+                    return "", []
+                
+                text_parts, emails = _read_pdf_pages(
+                    doc.page_count,
+                    lambda i: page0.get_text("text") if i == 0 else doc.load_page(i).get_text("text")
+                )
+            finally:
+                doc.close()
+        elif pypdfium2 is not None:
+            pdf = pypdfium2.PdfDocument(file_bytes)
+            try:
+                text_parts, emails = _read_pdf_pages(
+                    len(pdf), lambda i: pdf[i].get_textpage().get_text_range()
+                )
+            finally:
+                pdf.close()
+        else:
+            import pdfplumber
+            
+            with pdfplumber.open(_as_file(file_bytes)) as pdf:
+                text_parts, emails = _read_pdf_pages(
+                    len(pdf.pages), lambda i: pdf.pages[i].extract_text()
+                )
         
-        # CORRIGÉ: Extraire emails sur TOUT le texte AVANT troncature
-        emails = extract_emails_from_text(full_text)
+        # Emails déjà extraits sur TOUT le texte lu, AVANT troncature (_read_pdf_pages)
+        full_text = '\n'.join(part for part in text_parts if part)
         
         # Tronquer seulement pour l'IA après extraction
         if len(full_text) > MAX_FILE_CONTENT_LENGTH:
@@ -160,19 +523,19 @@ def parse_pdf_content(file_bytes: bytes) -> Tuple[str, List[str]]:
         return full_text, emails
         
     except ImportError:
-        print("⚠️ pdfplumber non installé")
+        print("⚠️ PyMuPDF/pypdfium2/pdfplumber non installé")
         return "", []
     except Exception as e:
         print(f"⚠️ Erreur parsing PDF: {e}")
         return "", []
 
 
-def parse_docx_content(file_bytes: bytes) -> Tuple[str, List[str]]:
-    """Parse un fichier DOCX."""
+def parse_docx_content(file_bytes: FileSource) -> Tuple[str, List[str]]:
+    """Parse un fichier DOCX. Accepte bytes ou chemin."""
     try:
         from docx import Document
         
-        doc = Document(BytesIO(file_bytes))
+        doc = Document(_as_file(file_bytes))
         text_parts = []
         
         for para in doc.paragraphs:
@@ -203,28 +566,41 @@ def parse_docx_content(file_bytes: bytes) -> Tuple[str, List[str]]:
         return "", []
 
 
-def parse_doc_content(file_bytes: bytes) -> Tuple[str, List[str]]:
-    """Parse un fichier DOC (ancien format)."""
+@functools.lru_cache(maxsize=1)
+def _antiword_path() -> Optional[str]:
+    """Chemin de antiword, résolu une seule fois (None si absent)."""
+    path = shutil.which('antiword')
+    if path is None:
+        print("⚠️ antiword/catdoc non installé (apt install antiword)")
+    return path
+
+
+def parse_doc_content(file_bytes: FileSource) -> Tuple[str, List[str]]:
+    """Parse un fichier DOC (ancien format). Accepte bytes ou chemin."""
     try:
-        import subprocess
-        import tempfile
-        import os
+        # Sans antiword: ni fichier temporaire ni tentative de subprocess
+        antiword = _antiword_path()
+        if antiword is None:
+            return "", []
         
-        with tempfile.NamedTemporaryFile(suffix='.doc', delete=False) as tmp:
-            tmp.write(file_bytes)
-            tmp_path = tmp.name
+        # Fichier déjà sur disque: antiword le lit directement
+        owns_tmp = not isinstance(file_bytes, str)
+        if owns_tmp:
+            with tempfile.NamedTemporaryFile(suffix='.doc', delete=False) as tmp:
+                tmp.write(file_bytes)
+                tmp_path = tmp.name
+        else:
+            tmp_path = file_bytes
         
         full_text = ""
         
-        # Tenter antiword
         try:
-            result = subprocess.run(['antiword', tmp_path], capture_output=True, text=True, timeout=30)
+            result = subprocess.run([antiword, tmp_path], capture_output=True, text=True, timeout=30)
             if result.returncode == 0:
                 full_text = result.stdout
-        except FileNotFoundError:
-            print("⚠️ antiword/catdoc non installé (apt install antiword)")
-        
-        os.unlink(tmp_path)
+        finally:
+            if owns_tmp:
+                os.unlink(tmp_path)
         
         if full_text:
             emails = extract_emails_from_text(full_text)
@@ -238,45 +614,141 @@ def parse_doc_content(file_bytes: bytes) -> Tuple[str, List[str]]:
         print(f"⚠️ Erreur parsing DOC: {e}")
         return "", []
 
-def download_and_parse_attachment(
+
+def _as_file(file_bytes: FileSource):
+    """Chemin tel quel, bytes enveloppés dans un BytesIO."""
+    return file_bytes if isinstance(file_bytes, str) else BytesIO(file_bytes)
+
+
+def _discard(file_bytes: Optional[FileSource]):
+    """Supprime le fichier temporaire éventuel d'un téléchargement."""
+    if isinstance(file_bytes, str):
+        try:
+            os.unlink(file_bytes)
+        except OSError:
+            pass
+
+
+def _attachment_cache_file(url: str) -> Path:
+    return ATTACHMENT_CACHE_DIR / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json"
+
+
+def load_attachment_from_cache(url: str) -> Optional[Tuple[str, List[str]]]:
+    """Résultat de parsing en cache pour cette URL (None si absent ou expiré)."""
+    cache_file = _attachment_cache_file(url)
+    try:
+        if time.time() - cache_file.stat().st_mtime > ATTACHMENT_CACHE_TTL:
+            return None
+        data = json.loads(cache_file.read_text(encoding='utf-8'))
+        return data['contenu_texte'], data['emails_fichier']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_attachment_to_cache(url: str, contenu: str, emails: List[str]):
+    """Mémorise le résultat de parsing (les échecs ne sont pas mis en cache)."""
+    if not contenu and not emails:
+        return
+    try:
+        ATTACHMENT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _attachment_cache_file(url).write_text(
+            json.dumps({'url': url, 'contenu_texte': contenu, 'emails_fichier': emails}, ensure_ascii=False),
+            encoding='utf-8'
+        )
+    except OSError as e:
+        logger.warning(f"      ⚠️ Erreur cache fichier: {e}")
+
+
+def download_attachment(
     url: str, 
-    file_type: str, 
     session: Optional[requests.Session] = None
-) -> Tuple[str, List[str]]:
+) -> Optional[FileSource]:
     """
-    Télécharge et parse un fichier attaché.
+    Télécharge un fichier attaché en streaming (abandon au-delà de 10MB).
     
-    Args:
-        url: URL du fichier
-        file_type: Type de fichier (pdf, doc, docx)
-        session: Session HTTP
+    Les fichiers > SPOOL_THRESHOLD sont écrits dans un fichier temporaire
+    (à supprimer par l'appelant via _discard) pour éviter une double copie en RAM.
     
     Returns:
-        Tuple (contenu_texte, emails_extraits)
+        Contenu binaire ou chemin temporaire, None si erreur / fichier trop volumineux
     """
     if session is None:
         session = create_session()
     
-    # Vérifier si parsable
-    if file_type not in ['pdf', 'doc', 'docx']:
-        return "", []
+    try:
+        # Le GET en streaming sert de preflight: seuls les en-têtes sont lus avant les vérifications
+        with polite_get(session, url, timeout=(CONNECT_TIMEOUT, DOWNLOAD_TIMEOUT)) as response:
+            response.raise_for_status()
+            
+            # Page HTML (login, redirection, 404 "soft") à la place du fichier: ne pas lire le corps
+            content_type = response.headers.get('Content-Type', '').lower()
+            if content_type.startswith(('text/html', 'application/xhtml')):
+                logger.warning(f"      ⚠️ Réponse HTML au lieu d'un fichier ({content_type}), ignorée")
+                return None
+            
+            # Vérifier taille annoncée (max 10MB)
+            content_length = response.headers.get('Content-Length')
+            if content_length and content_length.isdigit() and int(content_length) > MAX_DOWNLOAD_SIZE:
+                logger.warning("      ⚠️ Fichier trop volumineux (>10MB), ignoré")
+                return None
+            
+            # Taille réelle: abandon dès que la limite est dépassée
+            buffer = bytearray()
+            tmp = None
+            size = 0
+            try:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    size += len(chunk)
+                    if size > MAX_DOWNLOAD_SIZE:
+                        logger.warning("      ⚠️ Fichier trop volumineux (>10MB), ignoré")
+                        return None
+                    
+                    if tmp is None and size > SPOOL_THRESHOLD:
+                        suffix = os.path.splitext(urlparse(url).path)[1]
+                        tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+                        tmp.write(buffer)
+                    
+                    if tmp is not None:
+                        tmp.write(chunk)
+                    else:
+                        buffer.extend(chunk)
+                
+                if tmp is None:
+                    return bytes(buffer)
+                
+                tmp.close()
+                tmp_path, tmp = tmp.name, None
+                return tmp_path
+            finally:
+                # Abandon ou erreur en cours de route: pas de fichier orphelin
+                if tmp is not None:
+                    tmp.close()
+                    _discard(tmp.name)
+            
+    except requests.RequestException as e:
+        logger.warning(f"      ⚠️ Erreur téléchargement: {e}")
+        return None
+
+
+def fetch_all(
+    urls: List[str], 
+    session: Optional[requests.Session] = None, 
+    max_concurrent: int = 5
+) -> List[Optional[FileSource]]:
+    """Télécharge plusieurs fichiers en parallèle (ordre préservé)."""
+    if session is None:
+        session = create_session()
     
+    if len(urls) <= 1:
+        return [download_attachment(url, session) for url in urls]
+    
+    with ThreadPoolExecutor(max_workers=max_concurrent) as executor:
+        return list(executor.map(lambda url: download_attachment(url, session), urls))
+
+
+def parse_attachment_bytes(file_bytes: FileSource, file_type: str) -> Tuple[str, List[str]]:
+    """Parse le contenu (bytes ou chemin) selon le type (picklable pour ProcessPoolExecutor)."""
     try:
-        print(f"      📥 Téléchargement {file_type.upper()}...")
-        
-        # Télécharger
-        response = session.get(url, timeout=DOWNLOAD_TIMEOUT, stream=True)
-        response.raise_for_status()
-        
-        # Vérifier taille (max 10MB)
-        content_length = response.headers.get('Content-Length')
-        if content_length and int(content_length) > 10 * 1024 * 1024:
-            print(f"      ⚠️ Fichier trop volumineux (>10MB), ignoré")
-            return "", []
-        
-        file_bytes = response.content
-        
-        # Parser selon type
         if file_type == 'pdf':
             return parse_pdf_content(file_bytes)
         elif file_type == 'docx':
@@ -285,21 +757,87 @@ def download_and_parse_attachment(
             return parse_doc_content(file_bytes)
         else:
             return "", []
-            
-    except requests.RequestException as e:
-        print(f"      ⚠️ Erreur téléchargement: {e}")
-        return "", []
     except Exception as e:
         print(f"      ⚠️ Erreur parsing: {e}")
         return "", []
 
 
+_PARSE_POOL: Optional[ProcessPoolExecutor] = None
+_PARSE_POOL_LOCK = threading.Lock()
+
+
+def _parse_pool() -> ProcessPoolExecutor:
+    """
+    Pool de processus de parsing partagé par tous les threads détail (créé au premier appel).
+    
+    Le parsing PDF/DOC est CPU-bound: hors GIL, il chevauche les téléchargements
+    des autres threads. 'spawn': les workers ne héritent pas des verrous des
+    threads en cours (fork depuis un processus multi-thread).
+    """
+    global _PARSE_POOL
+    with _PARSE_POOL_LOCK:
+        if _PARSE_POOL is None:
+            _PARSE_POOL = ProcessPoolExecutor(
+                max_workers=MAX_PARSE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _PARSE_POOL
+
+
+def _reset_parse_pool(pool: ProcessPoolExecutor) -> None:
+    """Abandonne un pool cassé (worker tué par un fichier malformé); le suivant sera recréé."""
+    global _PARSE_POOL
+    with _PARSE_POOL_LOCK:
+        if _PARSE_POOL is pool:
+            _PARSE_POOL = None
+    pool.shutdown(wait=False)
+
+
+def download_and_parse_attachment(
+    url: str, 
+    file_type: str, 
+    session: Optional[requests.Session] = None
+) -> Tuple[str, List[str]]:
+    """
+    Télécharge et parse un fichier attaché.
+    
+    Args:
+        url: URL du fichier
+        file_type: Type de fichier (pdf, doc, docx)
+        session: Session HTTP
+    
+    Returns:
+        Tuple (contenu_texte, emails_extraits)
+    """
+    # Vérifier si parsable
+    if file_type not in ['pdf', 'doc', 'docx']:
+        return "", []
+    
+    cached = load_attachment_from_cache(url)
+    if cached is not None:
+        return cached
+    
+    logger.debug(f"      📥 Téléchargement {file_type.upper()}...")
+    
+    file_bytes = download_attachment(url, session)
+    if file_bytes is None:
+        return "", []
+    
+    try:
+        contenu, emails = parse_attachment_bytes(file_bytes, file_type)
+    finally:
+        _discard(file_bytes)
+    
+    save_attachment_to_cache(url, contenu, emails)
+    return contenu, emails
+
+
 # ============================================================================
 # EXTRACTION FICHIERS ATTACHÉS (v1.8 enrichi)
 # ============================================================================
 
 def extract_attachments(
-    soup: BeautifulSoup, 
+    soup, 
     session: Optional[requests.Session] = None,
     parse_content: bool = True
 ) -> List[Dict]:
@@ -307,7 +845,7 @@ def extract_attachments(
     Extrait les fichiers attachés avec parsing du contenu (v1.8).
     
     Args:
-        soup: Objet BeautifulSoup de la page
+        soup: Arbre HTML de la page (parse_html: selectolax ou BeautifulSoup)
         session: Session HTTP pour téléchargement
         parse_content: Si True, télécharge et parse les fichiers PDF/DOC/DOCX
     
@@ -317,95 +855,101 @@ def extract_attachments(
     fichiers: List[Dict] = []
     seen_urls: Set[str] = set()
     
-    # Sélecteurs multiples
-    selectors = [
-        'ul.post-attachments a',
-        'ul.wp-block-file a',
-        'div.wp-block-file a',
-        'a.attachment-link',
-        'a.wp-block-file__button',
-        'div.elementor-widget-attachment a',
-        'div.elementor-widget-icon-list a',
-        'a.download-link',
-        'a[download]',
-    ]
-    
-    # Ajouter sélecteurs par extension
-    for ext in VALID_FILE_EXTENSIONS:
-        selectors.append(f'a[href$="{ext}"]')
-        selectors.append(f'a[href$="{ext.upper()}"]')
-    
-    # Extraction
-    for selector in selectors:
+    # Extraction: une seule traversée du DOM (sélecteurs combinés)
+    try:
+        for a_tag in _css(_html_root(soup), ATTACHMENT_SELECTOR):
+            href = _attr(a_tag, 'href') or ''
+            
+            if not href or href in seen_urls:
+                continue
+            
+            if href.startswith('#') or href.startswith('javascript:'):
+                continue
+            
+            # Type de fichier = extension finale du chemin (hors query/fragment)
+            path = href.split('#', 1)[0].split('?', 1)[0]
+            type_fichier = path.rsplit('.', 1)[-1].lower()
+            if type_fichier not in _VALID_EXT_SET:
+                continue
+            
+            seen_urls.add(href)
+            
+            # Nom du fichier
+            nom = _text(a_tag)
+            if not nom or len(nom) < 3:
+                nom = href.split('/')[-1].split('?')[0]
+                try:
+                    from urllib.parse import unquote
+                    nom = unquote(nom)
+                except:
+                    pass
+            
+            nom = nom[:100].strip()
+            
+            # URL absolue
+            url_absolue = urljoin(BASE_URL, href)
+            
+            # Structure de base
+            fichiers.append({
+                'nom': nom,
+                'url': url_absolue,
+                'type': type_fichier,
+                'contenu_texte': '',      # NOUVEAU v1.8
+                'emails_fichier': []       # NOUVEAU v1.8
+            })
+            
+    except Exception as e:
+        logger.warning(f"⚠️ Erreur sélecteurs fichiers: {e}")
+    
+    # ================================================================
+    # PARSING CONTENU (NOUVEAU v1.8, parallélisé v1.9)
+    # ================================================================
+    if parse_content:
+        parsable = []
+        for f in fichiers:
+            if f['type'] not in ['pdf', 'doc', 'docx']:
+                continue
+            cached = load_attachment_from_cache(f['url'])
+            if cached is not None:
+                f['contenu_texte'], f['emails_fichier'] = cached
+            else:
+                parsable.append(f)
+        
+        urls = [f['url'] for f in parsable]
+        types = [f['type'] for f in parsable]
+        
+        # 1. Téléchargements concurrents (I/O-bound)
+        if parsable:
+            logger.debug(f"      📥 Téléchargement {len(parsable)} fichier(s)...")
+        contents = fetch_all(urls, session)
+        
+        # 2. Parsing (CPU-bound) sur le pool de processus partagé
+        #    (les gros fichiers passent par leur chemin temporaire, pas par pickle)
+        jobs = [(b, t) for b, t in zip(contents, types) if b is not None]
         try:
-            for a_tag in soup.select(selector):
-                href = a_tag.get('href', '')
-                
-                if not href or href in seen_urls:
-                    continue
-                
-                if href.startswith('#') or href.startswith('javascript:'):
-                    continue
-                
-                is_file = any(ext in href.lower() for ext in VALID_FILE_EXTENSIONS)
-                if not is_file:
-                    continue
-                
-                seen_urls.add(href)
-                
-                # Nom du fichier
-                nom = a_tag.get_text(strip=True)
-                if not nom or len(nom) < 3:
-                    nom = href.split('/')[-1].split('?')[0]
-                    try:
-                        from urllib.parse import unquote
-                        nom = unquote(nom)
-                    except:
-                        pass
-                
-                nom = nom[:100].strip()
-                
-                # Type de fichier
-                type_fichier = 'autre'
-                href_lower = href.lower()
-                
-                for ext in VALID_FILE_EXTENSIONS:
-                    if ext in href_lower:
-                        type_fichier = ext.replace('.', '')
-                        break
-                
-                # URL absolue
-                url_absolue = urljoin(BASE_URL, href)
-                
-                # Structure de base
-                fichier_data = {
-                    'nom': nom,
-                    'url': url_absolue,
-                    'type': type_fichier,
-                    'contenu_texte': '',      # NOUVEAU v1.8
-                    'emails_fichier': []       # NOUVEAU v1.8
-                }
-                
-                # ============================================================
-                # PARSING CONTENU (NOUVEAU v1.8)
-                # ============================================================
-                if parse_content and type_fichier in ['pdf', 'doc', 'docx']:
-                    contenu, emails = download_and_parse_attachment(
-                        url_absolue, 
-                        type_fichier, 
-                        session
-                    )
-                    fichier_data['contenu_texte'] = contenu
-                    fichier_data['emails_fichier'] = emails
-                    
-                    if contenu:
-                        print(f"      ✅ Parsé: {len(contenu)} chars, {len(emails)} email(s)")
-                
-                fichiers.append(fichier_data)
-                
-        except Exception as e:
-            print(f"⚠️ Erreur sélecteur {selector}: {e}")
-            continue
+            pool = _parse_pool()
+            try:
+                futures = [pool.submit(parse_attachment_bytes, b, t) for b, t in jobs]
+                parsed = [future.result() for future in futures]
+            except (BrokenProcessPool, RuntimeError) as e:
+                # Pool cassé ou fermé par un autre thread: fichiers de cette page non parsés
+                logger.warning(f"      ⚠️ Erreur pool de parsing: {e}")
+                _reset_parse_pool(pool)
+                parsed = [("", [])] * len(jobs)
+        finally:
+            for b in contents:
+                _discard(b)
+        
+        parsed_iter = iter(parsed)
+        results = [("", []) if b is None else next(parsed_iter) for b in contents]
+        
+        for fichier_data, (contenu, emails) in zip(parsable, results):
+            fichier_data['contenu_texte'] = contenu
+            fichier_data['emails_fichier'] = emails
+            save_attachment_to_cache(fichier_data['url'], contenu, emails)
+            
+            if contenu:
+                logger.debug(f"      ✅ Parsé: {len(contenu)} chars, {len(emails)} email(s)")
     
     return fichiers
 
@@ -414,6 +958,8 @@ def extract_attachments(
 # SCRAPING - PAGE LISTING
 # ============================================================================
 
+LISTING_LINK_SELECTOR = 'article.elementor-post h3.elementor-post__title a'
+
 def scrape_listing_page(url: str, session: Optional[requests.Session] = None) -> List[str]:
     """Scrape une page de listing pour extraire les URLs."""
     if session is None:
@@ -421,24 +967,19 @@ def scrape_listing_page(url: str, session: Optional[requests.Session] = None) ->
     
     try:
         human_delay(2, 4)
-        response = session.get(url, timeout=TIMEOUT)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'lxml')
-        
-        urls: Set[str] = set()
-        articles = soup.select('article.elementor-post')
+        tree = parse_html(fetch_html(session, url))
         
-        for article in articles:
-            title_link = article.select_one('h3.elementor-post__title a')
-            if title_link and title_link.get('href'):
-                href = title_link['href']
-                if '/evenement/' not in href:
-                    urls.add(href)
+        # Une seule requête CSS pour tous les liens titres des articles
+        urls: Dict[str, None] = {}
+        for title_link in _css(_html_root(tree), LISTING_LINK_SELECTOR):
+            href = _attr(title_link, 'href')
+            if href and '/evenement/' not in href:
+                urls[href] = None
         
         return list(urls)
     
     except Exception as e:
-        print(f"❌ Erreur scraping listing: {e}")
+        logger.error(f"❌ Erreur scraping listing: {e}")
         return []
 
 
@@ -446,6 +987,24 @@ def scrape_listing_page(url: str, session: Optional[requests.Session] = None) ->
 # SCRAPING - PAGE DÉTAIL (v1.8 avec parsing fichiers)
 # ============================================================================
 
+# Normalisation du texte de page (compilées une fois)
+_RE_MULTI_NL = re.compile(r'\n\s*\n')
+_RE_MULTI_SP = re.compile(r' {2,}')
+
+# Texte brut lu au plus (avant normalisation des blancs), le texte final est tronqué à 12000 chars
+MAX_TEXT_SCAN = 15000
+
+# Sélecteurs CSS de la page détail (définis une fois; le nettoyage = un seul groupe CSS)
+TITLE_SELECTORS = ('h1.elementor-heading-title', 'h1.entry-title', 'h1')
+DATE_SELECTORS = ('time', 'span.elementor-post-info__item--type-date', '.elementor-post-date', '.entry-date')
+CONTENT_ZONE_SELECTORS = ('div.elementor-widget-theme-post-content', 'article.elementor-post', 'div.entry-content', 'main')
+PAGE_CLEANUP_SELECTOR = 'nav, header, footer, aside, script, style, iframe'
+CONTENT_CLEANUP_SELECTOR = ', '.join((
+    PAGE_CLEANUP_SELECTOR,
+    '.breadcrumbs', '.share-buttons', '.post-navigation', 'ul.post-attachments',
+    '.elementor-widget-shortcode', '.elementor-social-icons-wrapper',
+))
+
 def scrape_detail_page(
     url: str, 
     session: Optional[requests.Session] = None,
@@ -466,28 +1025,30 @@ def scrape_detail_page(
         session = create_session()
     
     try:
-        human_delay(1, 3)
-        response = session.get(url, timeout=TIMEOUT)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'lxml')
+        # Petit jitter: la concurrence étale déjà la charge, le sémaphore par hôte la plafonne
+        human_delay(0.2, 0.5)
+        tree = parse_html(fetch_html(session, url))
+        root = _html_root(tree)
         
         # Titre
         titre = "Non spécifié"
-        for sel in ['h1.elementor-heading-title', 'h1.entry-title', 'h1']:
-            elem = soup.select_one(sel)
-            if elem and elem.get_text(strip=True):
-                titre = elem.get_text(strip=True)
-                break
+        for sel in TITLE_SELECTORS:
+            elem = _css_first(root, sel)
+            if elem is not None:
+                text = _text(elem)
+                if text:
+                    titre = text
+                    break
         
         # Organisation
         organisation = "À déterminer par IA"
         
         # Date
         date = "Non spécifié"
-        for sel in ['time', 'span.elementor-post-info__item--type-date', '.elementor-post-date', '.entry-date']:
-            date_elem = soup.select_one(sel)
-            if date_elem:
-                text = date_elem.get_text(strip=True)
+        for sel in DATE_SELECTORS:
+            date_elem = _css_first(root, sel)
+            if date_elem is not None:
+                text = _text(date_elem)
                 if any(char.isdigit() for char in text) and len(text) < 50:
                     date = text
                     break
@@ -495,41 +1056,53 @@ def scrape_detail_page(
         # ====================================================================
         # FICHIERS ATTACHÉS AVEC PARSING (v1.8)
         # ====================================================================
-        print(f"   📎 Extraction fichiers attachés...")
-        fichiers_attaches = extract_attachments(soup, session, parse_attachments)
+        logger.debug("   📎 Extraction fichiers attachés...")
+        fichiers_attaches = extract_attachments(tree, session, parse_attachments)
         
         # Collecter tous les emails des fichiers
-        emails_from_files = []
-        for f in fichiers_attaches:
-            emails_from_files.extend(f.get('emails_fichier', []))
-        emails_from_files = list(set(emails_from_files))
+        # Une passe, sans liste intermédiaire; dict.fromkeys garde l'ordre (sortie déterministe)
+        emails_from_files = list(dict.fromkeys(
+            e for f in fichiers_attaches for e in f.get('emails_fichier', ())
+        ))
         
         # ====================================================================
         # ZONE DE CONTENU
         # ====================================================================
         content_zone = None
-        for sel in ['div.elementor-widget-theme-post-content', 'article.elementor-post', 'div.entry-content', 'main']:
-            zone = soup.select_one(sel)
-            if zone:
+        for sel in CONTENT_ZONE_SELECTORS:
+            zone = _css_first(root, sel)
+            if zone is not None:
                 content_zone = zone
                 break
         
         # Nettoyage
-        if content_zone:
-            for tag in content_zone.select('nav, header, footer, aside, script, style, iframe, .breadcrumbs, .share-buttons, .post-navigation, ul.post-attachments, .elementor-widget-shortcode, .elementor-social-icons-wrapper'):
+        if content_zone is not None:
+            for tag in _css(content_zone, CONTENT_CLEANUP_SELECTOR):
                 tag.decompose()
         else:
-            content_zone = soup
-            for tag in soup.select('nav, header, footer, aside, script, style, iframe'):
+            content_zone = root
+            for tag in _css(root, PAGE_CLEANUP_SELECTOR):
                 tag.decompose()
         
-        # Texte complet
-        texte_complet = content_zone.get_text(separator='\n', strip=True)
-        texte_complet = re.sub(r'\n\s*\n', '\n\n', texte_complet)
-        texte_complet = re.sub(r' +', ' ', texte_complet)
+        # Texte complet: parcours paresseux, arrêt dès que la troncature est certaine
+        chunks: List[str] = []
+        total = 0
+        scan_truncated = False
+        for fragment in _iter_text(content_zone):
+            chunks.append(fragment)
+            total += len(fragment) + 1
+            if total > MAX_TEXT_SCAN:
+                scan_truncated = True
+                break
+        
+        texte_complet = '\n'.join(chunks)
+        texte_complet = _RE_MULTI_NL.sub('\n\n', texte_complet)
+        texte_complet = _RE_MULTI_SP.sub(' ', texte_complet)
         texte_complet = texte_complet.strip()
         
-        if len(texte_complet) > 12000:
+        # Marqueur aussi quand le parcours s'est arrêté tôt, même si la normalisation
+        # a ramené le texte sous 12000 chars: la fin de page manque
+        if scan_truncated or len(texte_complet) > 12000:
             texte_complet = texte_complet[:12000] + "...[texte tronqué]"
         
         # ====================================================================
@@ -546,7 +1119,7 @@ def scrape_detail_page(
         }
     
     except Exception as e:
-        print(f"❌ Erreur scraping détail: {e}")
+        logger.error(f"❌ Erreur scraping détail: {e}")
         return None
 
 
@@ -558,7 +1131,8 @@ def scrape_tanmia(
     url_type: str, 
     max_pages: int, 
     progress_callback=None,
-    parse_attachments: bool = True
+    parse_attachments: bool = True,
+    stats: Optional[Dict] = None
 ) -> List[Dict]:
     """
     Fonction principale de scraping avec parsing fichiers (v1.8).
@@ -566,45 +1140,77 @@ def scrape_tanmia(
     Args:
         url_type: "appels-doffres" ou "offres-demploi"
         max_pages: Nombre de pages à scraper
-        progress_callback: Callback progression
+        progress_callback: Callback progression (progress, message), appelé
+            au plus ~50 fois par phase, toujours pour le dernier élément
         parse_attachments: Si True, parse le contenu des PDF/DOC/DOCX
+        stats: Dict rempli en place (total_fichiers, total_parses,
+            total_emails_files) pendant le scraping, évite de re-parcourir
+            les résultats côté UI
     
     Returns:
         Liste de dicts avec données complètes
     """
+    _setup_logging()
     session = create_session()
     all_urls: List[str] = []
+    seen_urls: Set[str] = set()
     results: List[Dict] = []
     
+    # Détail par page/opportunité: masqué quand l'UI affiche déjà la progression
+    item_level = logging.DEBUG if progress_callback else logging.INFO
+    
     # Phase 1: Listings
-    print(f"\n🔍 PHASE 1: Scraping des listings ({max_pages} pages)")
-    print("=" * 60)
+    logger.info(f"\n🔍 PHASE 1: Scraping des listings ({max_pages} pages)")
+    logger.info("=" * 60)
     
     for page_num in range(1, max_pages + 1):
         page_url = f"{BASE_URL}/{url_type}/" if page_num == 1 else f"{BASE_URL}/{url_type}/{page_num}/"
-        print(f"📄 Page {page_num}/{max_pages}: {page_url}")
+        logger.log(item_level, f"📄 Page {page_num}/{max_pages}: {page_url}")
         
         urls = scrape_listing_page(page_url, session)
-        print(f"   ✅ {len(urls)} opportunités trouvées")
-        all_urls.extend(urls)
+        logger.log(item_level, f"   ✅ {len(urls)} opportunités trouvées")
         
-        if progress_callback:
+        # Dédoublonnage au fil des pages (listes paginées qui se chevauchent), ordre conservé
+        for u in urls:
+            if u not in seen_urls:
+                seen_urls.add(u)
+                all_urls.append(u)
+        
+        if progress_callback and (page_num % max(1, max_pages // 50) == 0 or page_num == max_pages):
             progress_callback(page_num / max_pages * 0.3, f"Page {page_num}/{max_pages}")
     
-    all_urls = list(set(all_urls))
-    print(f"\n✅ Total unique: {len(all_urls)} opportunités")
+    logger.info(f"\n✅ Total unique: {len(all_urls)} opportunités")
     
     # Phase 2: Détails + Parsing
-    print(f"\n📊 PHASE 2: Extraction détails + PARSING FICHIERS (v1.8)")
-    print("=" * 60)
+    logger.info(f"\n📊 PHASE 2: Extraction détails + PARSING FICHIERS (v1.8)")
+    logger.info("=" * 60)
     
     total_fichiers = 0
+    total_parses = 0
     total_emails_fichiers = 0
     
-    for idx, url in enumerate(all_urls, 1):
-        print(f"\n🔗 {idx}/{len(all_urls)}: {url[:60]}...")
+    # Pages détail en parallèle (I/O-bound); agrégation dans le thread appelant
+    details: List[Optional[Dict]] = [None] * len(all_urls)
+    
+    with ThreadPoolExecutor(max_workers=MAX_DETAIL_WORKERS) as executor:
+        futures = {
+            executor.submit(scrape_detail_page, url, session, parse_attachments): pos
+            for pos, url in enumerate(all_urls)
+        }
         
-        detail = scrape_detail_page(url, session, parse_attachments)
+        for idx, future in enumerate(as_completed(futures), 1):
+            pos = futures[future]
+            try:
+                details[pos] = future.result()
+            except Exception as e:
+                logger.error(f"❌ Erreur scraping détail: {e}")
+            
+            if progress_callback and (idx % max(1, len(all_urls) // 50) == 0 or idx == len(all_urls)):
+                progress = 0.3 + (idx / len(all_urls)) * 0.7
+                progress_callback(progress, f"Détail {idx}/{len(all_urls)}")
+    
+    for idx, (url, detail) in enumerate(zip(all_urls, details), 1):
+        logger.log(item_level, f"\n🔗 {idx}/{len(all_urls)}: {url[:60]}...")
         
         if detail:
             nb_fichiers = len(detail.get('fichiers_attaches', []))
@@ -614,23 +1220,27 @@ def scrape_tanmia(
             
             # Compter fichiers parsés
             nb_parses = sum(1 for f in detail.get('fichiers_attaches', []) if f.get('contenu_texte'))
+            total_parses += nb_parses
             
-            print(f"   ✅ {nb_fichiers} fichier(s) | {nb_parses} parsé(s) | {nb_emails_files} email(s) extraits")
+            logger.log(item_level, f"   ✅ {nb_fichiers} fichier(s) | {nb_parses} parsé(s) | {nb_emails_files} email(s) extraits")
             results.append(detail)
         else:
-            print(f"   ❌ Échec")
-        
-        if progress_callback:
-            progress = 0.3 + (idx / len(all_urls)) * 0.7
-            progress_callback(progress, f"Détail {idx}/{len(all_urls)}")
+            logger.log(item_level, "   ❌ Échec")
     
     # Résumé
-    print(f"\n{'=' * 60}")
-    print(f"✅ SCRAPING v1.8 TERMINÉ")
-    print(f"   • Opportunités: {len(results)}/{len(all_urls)}")
-    print(f"   • Fichiers détectés: {total_fichiers}")
-    print(f"   • Emails extraits des fichiers: {total_emails_fichiers}")
-    print(f"{'=' * 60}")
+    logger.info(f"\n{'=' * 60}")
+    logger.info("✅ SCRAPING v1.8 TERMINÉ")
+    logger.info(f"   • Opportunités: {len(results)}/{len(all_urls)}")
+    logger.info(f"   • Fichiers détectés: {total_fichiers}")
+    logger.info(f"   • Emails extraits des fichiers: {total_emails_fichiers}")
+    logger.info(f"{'=' * 60}")
+    
+    if stats is not None:
+        stats.update(
+            total_fichiers=total_fichiers,
+            total_parses=total_parses,
+            total_emails_files=total_emails_fichiers
+        )
     
     return results
 
@@ -641,9 +1251,27 @@ def scrape_tanmia(
 
 def test_scraper():
     """Test du scraper v1.8."""
+    _setup_logging()
     print("🧪 TEST SCRAPER v1.8 (avec parsing fichiers)")
     print("=" * 60)
     
+    # Test emails (hors réseau)
+    print("\n📧 Test 0: Extraction emails obfusquées...")
+    assert extract_emails_from_text("contact AT tanmia DOT ma") == ['contact@tanmia.ma']
+    assert extract_emails_from_text("info [at] tanmia [dot] ma") == ['info@tanmia.ma']
+    assert extract_emails_from_text("Rendez-vous At Rabat Dot Com") == []  # Prose en casse mixte
+    print("   OK")
+    
+    # Test décodage (hors réseau): pages non UTF-8
+    print("\n🔤 Test 0b: Décodage HTML...")
+    page = '<html><body><p>Événement à Fès</p></body></html>'
+    assert _decode_html(page.encode('cp1252'), 'text/html; charset=windows-1252') == page
+    assert _decode_html(page.replace('<html>', '<html><meta charset="iso-8859-1">').encode('latin-1'), 'text/html').endswith('Fès</p></body></html>')
+    assert _decode_html(page.encode('utf-8') + 'é'.encode('utf-8')[:1]) == page  # Troncature UTF-8
+    assert _decode_html(page.encode('cp1252')) == page  # Sans charset déclaré
+    assert _text(_css_first(_html_root(parse_html(_decode_html(page.encode('cp1252'), 'text/html; charset=windows-1252'))), 'p')) == 'Événement à Fès'
+    print("   OK")
+    
     # Test listing
     print("\n📄 Test 1: Scraping listing...")
     urls = scrape_listing_page("https://tanmia.ma/appels-doffres/")
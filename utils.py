@@ -9,6 +9,7 @@ CHANGELOG v1.8:
 - Amélioration: Fusion automatique emails page + fichiers
 """
 import pandas as pd
+import xlsxwriter
 from io import BytesIO
 from datetime import datetime
 from typing import List, Dict, Tuple, Optional
@@ -31,23 +32,20 @@ def format_fichiers_attaches(fichiers: List[Dict]) -> Tuple[str, str, int, str,
     if not fichiers or len(fichiers) == 0:
         return '', '', 0, '', 0
     
-    noms = [f.get('nom', 'Sans nom') for f in fichiers]
-    urls = [f.get('url', '') for f in fichiers]
+    # Une seule traversée des fichiers, colonnes dépaquetées par zip
+    noms, urls, emails_lists, parses = zip(*(
+        (f.get('nom', 'Sans nom'), f.get('url', ''), f.get('emails_fichier', ()), bool(f.get('contenu_texte')))
+        for f in fichiers
+    ))
     
-    # Emails extraits des fichiers (v1.8)
-    all_emails_fichiers = []
-    nb_parses = 0
+    nb_parses = sum(parses)
     
-    for f in fichiers:
-        emails_f = f.get('emails_fichier', [])
-        all_emails_fichiers.extend(emails_f)
-        
-        if f.get('contenu_texte'):
-            nb_parses += 1
+    # Emails extraits des fichiers (v1.8), dédupliqués dans l'ordre d'apparition
+    all_emails_fichiers = dict.fromkeys(e for sub in emails_lists for e in sub)
     
     noms_str = ', '.join(noms)
     urls_str = '\n'.join(urls)
-    emails_fichiers_str = ', '.join(set(all_emails_fichiers))
+    emails_fichiers_str = ', '.join(all_emails_fichiers)
     
     return noms_str, urls_str, len(fichiers), emails_fichiers_str, nb_parses
 
@@ -61,17 +59,35 @@ def export_to_excel(df: pd.DataFrame) -> bytes:
     Exporte un DataFrame vers Excel avec formatage v1.8.
     
     Inclut colonnes emails fichiers et indicateurs parsing.
+    Formats appliqués par colonne / mise en forme conditionnelle (xlsxwriter),
+    sans itération Python cellule par cellule.
+    
+    Écriture ligne par ligne en mode constant_memory: chaque ligne est vidée
+    dès que la suivante commence, la mémoire reste stable quelle que soit la
+    taille du DataFrame (df.to_excel écrit colonne par colonne, incompatible).
     """
     output = BytesIO()
+    nb_rows = len(df)
+    nb_cols = len(df.columns)
     
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Opportunités')
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'strings_to_urls': False})
+    try:
+        worksheet = workbook.add_worksheet('Opportunités')
         
-        worksheet = writer.sheets['Opportunités']
+        header_format = workbook.add_format({
+            'bold': True, 'font_size': 11, 'font_color': '#FFFFFF',
+            'bg_color': '#366092', 'align': 'center', 'valign': 'vcenter',
+            'text_wrap': True, 'border': 1
+        })
+        content_format = workbook.add_format({'valign': 'top', 'text_wrap': True})
+        border_format = workbook.add_format({'border': 1})
+        highlight_format = workbook.add_format({'bg_color': '#D4EDDA'})  # Vert clair
+        email_format = workbook.add_format({'bg_color': '#CCE5FF'})  # Bleu clair
         
-        # Auto-ajustement colonnes
+        # Auto-ajustement colonnes (longueurs via .str.len(), sans boucle Python par cellule)
         for idx, column in enumerate(df.columns):
-            max_length = df[column].astype(str).map(len).max()
+            max_length = df[column].astype('string').str.len().max()
+            max_length = 0 if pd.isna(max_length) else int(max_length)
             header_length = len(column)
             column_length = max(max_length, header_length)
             
@@ -82,66 +98,49 @@ def export_to_excel(df: pd.DataFrame) -> bytes:
             else:
                 column_length = min(column_length + 2, 30)
             
-            col_letter = get_column_letter(idx + 1)
-            worksheet.column_dimensions[col_letter].width = column_length
-        
-        # Formatage header
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        
-        header_font = Font(bold=True, size=11, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+            worksheet.set_column(idx, idx, column_length, content_format)
         
-        for cell in worksheet[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # Formatage contenu
-        content_alignment = Alignment(vertical="top", wrap_text=True)
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        for row in worksheet.iter_rows(min_row=2, max_row=len(df) + 1):
-            for cell in row:
-                cell.alignment = content_alignment
-                cell.border = thin_border
-        
-        # Surlignage lignes avec fichiers parsés (v1.8)
-        if 'Nb_Parses' in df.columns:
-            highlight_fill = PatternFill(start_color="D4EDDA", end_color="D4EDDA", fill_type="solid")  # Vert clair
-            highlight_fill_partial = PatternFill(start_color="FFF3CD", end_color="FFF3CD", fill_type="solid")  # Jaune
+        if nb_rows > 0:
+            last_row = nb_rows
+            last_col = nb_cols - 1
             
-            nb_parses_col = df.columns.get_loc('Nb_Parses') + 1
+            # Surlignage emails fichiers (v1.8), prioritaire sur le surlignage de ligne
+            if 'Emails_Fichiers' in df.columns:
+                emails_col = df.columns.get_loc('Emails_Fichiers')
+                emails_letter = get_column_letter(emails_col + 1)
+                worksheet.conditional_format(1, emails_col, last_row, emails_col, {
+                    'type': 'formula',
+                    'criteria': f'=LEN(TRIM(${emails_letter}2))>0',
+                    'format': email_format
+                })
             
-            for row_idx in range(2, len(df) + 2):
-                cell_value = worksheet.cell(row=row_idx, column=nb_parses_col).value
-                try:
-                    if cell_value and int(cell_value) > 0:
-                        # Vert: fichiers parsés avec succès
-                        for col_idx in range(1, len(df.columns) + 1):
-                            worksheet.cell(row=row_idx, column=col_idx).fill = highlight_fill
-                except:
-                    pass
-        
-        # Surlignage emails fichiers (v1.8)
-        if 'Emails_Fichiers' in df.columns:
-            email_highlight = PatternFill(start_color="CCE5FF", end_color="CCE5FF", fill_type="solid")  # Bleu clair
-            emails_col = df.columns.get_loc('Emails_Fichiers') + 1
+            # Surlignage lignes avec fichiers parsés (v1.8)
+            if 'Nb_Parses' in df.columns:
+                parses_letter = get_column_letter(df.columns.get_loc('Nb_Parses') + 1)
+                worksheet.conditional_format(1, 0, last_row, last_col, {
+                    'type': 'formula',
+                    'criteria': f'=${parses_letter}2>0',
+                    'format': highlight_format
+                })
             
-            for row_idx in range(2, len(df) + 2):
-                cell_value = worksheet.cell(row=row_idx, column=emails_col).value
-                if cell_value and len(str(cell_value).strip()) > 0:
-                    worksheet.cell(row=row_idx, column=emails_col).fill = email_highlight
+            # Bordures limitées aux lignes de données
+            worksheet.conditional_format(1, 0, last_row, last_col, {
+                'type': 'no_errors',
+                'format': border_format
+            })
         
-        worksheet.freeze_panes = 'A2'
+        worksheet.freeze_panes(1, 0)
         
-        for row in range(2, len(df) + 2):
-            worksheet.row_dimensions[row].height = 45
+        # Formatage header
+        worksheet.write_row(0, 0, list(df.columns), header_format)
+        
+        # Données, strictement dans l'ordre des lignes (NA -> cellule vide)
+        values = df.astype(object).where(df.notna(), None)
+        for row_idx, row in enumerate(values.itertuples(index=False, name=None), 1):
+            worksheet.set_row(row_idx, 45)
+            worksheet.write_row(row_idx, 0, row)
+    finally:
+        workbook.close()
     
     output.seek(0)
     return output.getvalue()
@@ -195,9 +194,7 @@ def calculate_statistics(df: pd.DataFrame) -> Dict:
     
     # Emails (page)
     if 'Email' in df.columns:
-        avec_email = df['Email'].apply(
-            lambda x: len(str(x).strip()) > 0 and str(x).strip() != ''
-        ).sum()
+        avec_email = (df['Email'].fillna('').astype(str).str.strip() != '').sum()
         stats['avec_email'] = int(avec_email)
         stats['sans_email'] = len(df) - stats['avec_email']
         stats['taux_email'] = round((stats['avec_email'] / len(df)) * 100, 1)
@@ -215,32 +212,23 @@ def calculate_statistics(df: pd.DataFrame) -> Dict:
     
     # Fichiers (v1.7)
     if 'Nb_Fichiers' in df.columns:
-        avec_fichiers = df['Nb_Fichiers'].apply(
-            lambda x: int(x) > 0 if pd.notna(x) else False
-        ).sum()
-        total_fichiers = df['Nb_Fichiers'].apply(
-            lambda x: int(x) if pd.notna(x) else 0
-        ).sum()
+        nb_fichiers = pd.to_numeric(df['Nb_Fichiers'], errors='coerce').fillna(0).astype(int)
         
-        stats['avec_fichiers'] = int(avec_fichiers)
-        stats['total_fichiers'] = int(total_fichiers)
+        stats['avec_fichiers'] = int((nb_fichiers > 0).sum())
+        stats['total_fichiers'] = int(nb_fichiers.sum())
         stats['taux_fichiers'] = round((stats['avec_fichiers'] / len(df)) * 100, 1)
     
     # Fichiers parsés (v1.8)
     if 'Nb_Parses' in df.columns:
-        total_parses = df['Nb_Parses'].apply(
-            lambda x: int(x) if pd.notna(x) else 0
-        ).sum()
-        stats['fichiers_parses'] = int(total_parses)
+        nb_parses = pd.to_numeric(df['Nb_Parses'], errors='coerce').fillna(0).astype(int)
+        stats['fichiers_parses'] = int(nb_parses.sum())
         
         if stats['total_fichiers'] > 0:
             stats['taux_parsing'] = round((stats['fichiers_parses'] / stats['total_fichiers']) * 100, 1)
     
     # Emails from files (v1.8)
     if 'Emails_Fichiers' in df.columns:
-        avec_emails_fichiers = df['Emails_Fichiers'].apply(
-            lambda x: len(str(x).strip()) > 0 and str(x).strip() != ''
-        ).sum()
+        avec_emails_fichiers = (df['Emails_Fichiers'].fillna('').astype(str).str.strip() != '').sum()
         stats['emails_from_files'] = int(avec_emails_fichiers)
     
     return stats
@@ -251,11 +239,10 @@ def calculate_statistics(df: pd.DataFrame) -> Dict:
 # ============================================================================
 
 def format_email_column(emails: List[str]) -> str:
-    """Formate liste d'emails pour affichage."""
-    if not emails or len(emails) == 0:
+    """Formate liste d'emails pour affichage (dédupliqués, triés)."""
+    if not emails:
         return ""
-    unique_emails = sorted(set(emails))
-    return ", ".join(unique_emails)
+    return ", ".join(sorted(set(emails)))
 
 
 def format_keywords_column(keywords: List[str]) -> str:
@@ -283,52 +270,56 @@ def truncate_text(text: str, max_length: int = 100) -> str:
 def merge_analysis_results(
     scraped_data: List[Dict],
     analysis_results: List[Dict]
-) -> List[Dict]:
+) -> Dict[str, List]:
     """
     Fusionne données scrapées et résultats IA (v1.8).
     
     Inclut emails fichiers et stats parsing.
+    Résultat en colonnes (dict de listes), passé tel quel à pd.DataFrame:
+    pas de dict par ligne à construire puis re-parcourir.
     """
-    merged = []
+    columns: Dict[str, List] = {
+        # Données brutes
+        'URL': [], 'Titre': [], 'Date': [],
+        # Données analysées
+        'Organisation': [], 'Email': [], 'Secteur': [], 'Type': [],
+        'Localisation': [], 'Résumé': [], 'Mots-clés': [],
+        # Fichiers (v1.7)
+        'Fichiers': [], 'Liens_Fichiers': [], 'Nb_Fichiers': [],
+        # Parsing (v1.8 NOUVEAU)
+        'Emails_Fichiers': [], 'Nb_Parses': [],
+    }
     
     for scraped, analysis in zip(scraped_data, analysis_results):
         # Fichiers avec infos parsing (v1.8)
         fichiers = scraped.get('fichiers_attaches', [])
         noms_fichiers, urls_fichiers, nb_fichiers, emails_fichiers, nb_parses = format_fichiers_attaches(fichiers)
         
-        # Emails: fusionner page + fichiers (v1.8)
+        # Emails: fusionner page + fichiers (v1.8), dédupliqués une seule fois par format_email_column
         emails_page = analysis.get('emails', [])
         emails_from_files = scraped.get('emails_from_files', [])
-        all_emails = list(set(emails_page + emails_from_files))
+        all_emails = emails_page + emails_from_files
         
-        merged_item = {
-            # Données brutes
-            'URL': scraped.get('url', ''),
-            'Titre': scraped.get('titre', ''),
-            'Date': scraped.get('date', ''),
-            
-            # Données analysées
-            'Organisation': analysis.get('organisation', scraped.get('organisation', 'Non spécifié')),
-            'Email': format_email_column(all_emails),  # Fusionnés v1.8
-            'Secteur': analysis.get('secteur', ''),
-            'Type': analysis.get('type_opportunite', ''),
-            'Localisation': analysis.get('localisation', ''),
-            'Résumé': analysis.get('resume', ''),
-            'Mots-clés': format_keywords_column(analysis.get('mots_cles', [])),
-            
-            # Fichiers (v1.7)
-            'Fichiers': noms_fichiers,
-            'Liens_Fichiers': urls_fichiers,
-            'Nb_Fichiers': nb_fichiers,
-            
-            # Parsing (v1.8 NOUVEAU)
-            'Emails_Fichiers': emails_fichiers,
-            'Nb_Parses': nb_parses
-        }
+        columns['URL'].append(scraped.get('url', ''))
+        columns['Titre'].append(scraped.get('titre', ''))
+        columns['Date'].append(scraped.get('date', ''))
+        
+        columns['Organisation'].append(analysis.get('organisation', scraped.get('organisation', 'Non spécifié')))
+        columns['Email'].append(format_email_column(all_emails))  # Fusionnés v1.8
+        columns['Secteur'].append(analysis.get('secteur', ''))
+        columns['Type'].append(analysis.get('type_opportunite', ''))
+        columns['Localisation'].append(analysis.get('localisation', ''))
+        columns['Résumé'].append(analysis.get('resume', ''))
+        columns['Mots-clés'].append(format_keywords_column(analysis.get('mots_cles', [])))
+        
+        columns['Fichiers'].append(noms_fichiers)
+        columns['Liens_Fichiers'].append(urls_fichiers)
+        columns['Nb_Fichiers'].append(nb_fichiers)
         
-        merged.append(merged_item)
+        columns['Emails_Fichiers'].append(emails_fichiers)
+        columns['Nb_Parses'].append(nb_parses)
     
-    return merged
+    return columns
 
 
 # ============================================================================
@@ -410,9 +401,9 @@ def test_utils():
         'mots_cles': ['M&E']
     }]
     merged = merge_analysis_results(scraped, analysis)
-    print(f"   Email (fusionné): {merged[0]['Email']}")
-    print(f"   Emails_Fichiers: {merged[0]['Emails_Fichiers']}")
-    print(f"   Nb_Parses: {merged[0]['Nb_Parses']}")
+    print(f"   Email (fusionné): {merged['Email'][0]}")
+    print(f"   Emails_Fichiers: {merged['Emails_Fichiers'][0]}")
+    print(f"   Nb_Parses: {merged['Nb_Parses'][0]}")
     
     # Test stats v1.8
     print("\n3. Statistiques v1.8:")